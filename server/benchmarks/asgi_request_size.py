@@ -0,0 +1,88 @@
+"""
+Checks that bulk create bodies of realistic sizes get through the ASGI
+dispatcher to the Flask app, and times how long each takes to be parsed.
+
+Bodies carry no source identifier, so the Flask route answers with its own
+400 validation error once it has read the body, without calling Spotify; an
+empty 400 means the body was rejected before reaching it. Run from the server
+directory:
+    python benchmarks/asgi_request_size.py --songs 500 5000 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.asgi import app  # noqa: E402
+
+
+def make_song(uri: str, month: int) -> Dict[str, str]:
+    """A song as the client sends it back from the preview."""
+    return {
+        "id": uri,
+        "name": f"Track {uri[-6:]}",
+        "artists": "Some Artist, Another Artist",
+        "added_at": f"2023-{month % 12 + 1:02d}-15T12:00:00Z",
+        "uri": uri,
+    }
+
+
+def make_body(songs: int, months: int) -> Dict[str, Any]:
+    per_month = max(1, songs // months)
+    return {
+        "type": "id",
+        "playlists": [
+            {
+                "name": f"Month {m}",
+                "songs": [
+                    make_song(f"spotify:track:{m:04d}{s:018d}", m)
+                    for s in range(per_month)
+                ],
+            }
+            for m in range(months)
+        ],
+    }
+
+
+async def send(songs: List[int], months: int) -> bool:
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        for count in songs:
+            content = json.dumps(make_body(count, months)).encode("utf-8")
+            start = time.perf_counter()
+            response = await c.post(
+                "/api/create-monthly-playlists",
+                content=content,
+                headers={"Content-Type": "application/json"},
+                cookies={"spotify_access_token": "check"},
+            )
+            elapsed = time.perf_counter() - start
+            reached_flask = response.status_code == 400 and bool(response.content)
+            ok = ok and reached_flask
+            print(
+                f"{count:7} songs {len(content) / 1024:9.1f} KiB "
+                f"{response.status_code} {'ok' if reached_flask else 'REJECTED'}"
+                f" {elapsed * 1000:8.1f} ms"
+            )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--songs", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--months", type=int, default=1)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(send(args.songs, args.months)) else 1)
+
+
+if __name__ == "__main__":
+    main()
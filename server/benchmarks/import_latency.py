@@ -0,0 +1,88 @@
+"""
+Measures how long a fresh worker takes to import the Flask app.
+
+Each sample runs in a new interpreter so nothing is cached between runs.
+Run from the server directory:
+    python benchmarks/import_latency.py --runs 20
+    python benchmarks/import_latency.py --warm-up --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import src.app\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def run_once(env: Dict[str, str]) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=SERVER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: Dict[str, str], top: int) -> List[Tuple[int, str]]:
+    """Returns the modules with the largest cumulative import time, in µs."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.app"],
+        cwd=SERVER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings: List[Tuple[int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--warm-up", action="store_true", help="Set MONTHLIFY_WARM_UP=1."
+    )
+    parser.add_argument(
+        "--top", type=int, default=0, help="Show the N slowest imports."
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.warm_up:
+        env["MONTHLIFY_WARM_UP"] = "1"
+
+    samples = [run_once(env) for _ in range(args.runs)]
+    print(
+        f"import src.app ({'warm-up' if args.warm_up else 'lazy'}, "
+        f"{args.runs} runs): "
+        f"median {statistics.median(samples) * 1000:.1f} ms, "
+        f"min {min(samples) * 1000:.1f} ms, "
+        f"max {max(samples) * 1000:.1f} ms"
+    )
+
+    if args.top:
+        for cumulative, name in slowest_imports(env, args.top):
+            print(f"{cumulative / 1000:10.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compares JSON encoding and response compression for a large preview payload.
+
+Each configuration serves the same synthetic multi-year preview through a Flask
+app and reports server time per response and bytes on the wire.
+Run from the server directory:
+    python benchmarks/json_compression.py --months 60 --tracks 400
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compression import register_compression  # noqa: E402
+from src.json_provider import OrjsonProvider, orjson  # noqa: E402
+from src.models.spotify_types import MonthlyPlaylistPreview  # noqa: E402
+from src.spotify_utils import get_month_name  # noqa: E402
+
+ARTISTS = [f"Artist {i}" for i in range(300)]
+
+
+def make_preview(months: int, tracks: int) -> List[MonthlyPlaylistPreview]:
+    rng = random.Random(0)
+    preview: List[MonthlyPlaylistPreview] = []
+    for m in range(months):
+        year, month = 2015 + m // 12, m % 12 + 1
+        items = []
+        for t in range(tracks):
+            uri = f"spotify:track:{rng.getrandbits(80):022x}"
+            items.append(
+                {
+                    "id": uri,
+                    "name": f"Track {m}-{t}",
+                    "artists": ", ".join(rng.sample(ARTISTS, rng.randint(1, 3))),
+                    "added_at": (
+                        f"{year}-{month:02d}-{rng.randint(1, 28):02d}T12:00:00Z"
+                    ),
+                    "uri": uri,
+                }
+            )
+        preview.append(
+            {
+                "id": f"{year}-{month:02d}",
+                "name": f"{get_month_name(month)} {year}",
+                "tracks": items,  # type: ignore[typeddict-item]
+            }
+        )
+    return preview
+
+
+def build_app(
+    payload: List[MonthlyPlaylistPreview], fast_json: bool, compress: bool
+) -> Flask:
+    app = Flask(__name__)
+    app.json = (OrjsonProvider if fast_json else DefaultJSONProvider)(app)
+    if compress:
+        register_compression(app)
+
+    @app.route("/preview")
+    def preview():  # type: ignore[no-untyped-def]
+        return jsonify({"preview_data": payload})
+
+    return app
+
+
+def run(
+    payload: List[MonthlyPlaylistPreview],
+    fast_json: bool,
+    accept_encoding: Optional[str],
+    runs: int,
+) -> None:
+    app = build_app(payload, fast_json, compress=accept_encoding is not None)
+    client = app.test_client()
+    headers = {"Accept-Encoding": accept_encoding} if accept_encoding else {}
+
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get("/preview", headers=headers)
+        timings.append(time.perf_counter() - start)
+        size = len(response.get_data())
+
+    label = (
+        f"{'orjson' if fast_json else 'stdlib'} + "
+        f"{response.headers.get('Content-Encoding', 'identity')}"
+    )
+    print(
+        f"{label:18} {min(timings) * 1000:8.1f} ms/response (best of {runs})"
+        f" {size / 1024:10.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--months", type=int, default=60)
+    parser.add_argument("--tracks", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    payload = make_preview(args.months, args.tracks)
+    configurations = [(False, None), (False, "gzip")]
+    if orjson is not None:
+        configurations += [(True, None), (True, "gzip"), (True, "br, gzip")]
+    for fast_json, accept_encoding in configurations:
+        run(payload, fast_json, accept_encoding, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Deque, Iterator
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; `retry_after` is in seconds."""
+
+    def __init__(self, gate: str, retry_after: int) -> None:
+        super().__init__(f"'{gate}' is over capacity, retry in {retry_after}s.")
+        self.gate = gate
+        self.retry_after = retry_after
+
+
+class _Gate:
+    """The capacity and queue bookkeeping shared by the admission gates."""
+
+    def __init__(
+        self, name: str, capacity: int, max_queue: int, max_wait: float
+    ) -> None:
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._in_use = 0
+        self._queue: Deque[object] = deque()
+        # Moving average of how long an admitted request holds its slot.
+        self._avg_hold_seconds = 1.0
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def retry_after(self) -> int:
+        """Estimates when the queue ahead of a new request will have drained."""
+        waves = (len(self._queue) + 1) / max(self.capacity, 1)
+        return max(1, math.ceil(self._avg_hold_seconds * waves))
+
+    def _fits(self, cost: int) -> bool:
+        return self._in_use == 0 or self._in_use + cost <= self.capacity
+
+    def _release(self, cost: int, started: float) -> None:
+        self._in_use -= cost
+        held = time.monotonic() - started
+        self._avg_hold_seconds += 0.2 * (held - self._avg_hold_seconds)
+
+
+class AdmissionGate(_Gate):
+    """
+    Limits the total cost of the requests running through one route to `capacity`.
+    Requests that do not fit wait in a FIFO queue of at most `max_queue` entries
+    for up to `max_wait` seconds; beyond that they fail fast with `Overloaded`
+    instead of tying up a worker. A request costing more than the whole capacity
+    is admitted alone.
+    """
+
+    def __init__(
+        self, name: str, capacity: int, max_queue: int, max_wait: float
+    ) -> None:
+        super().__init__(name, capacity, max_queue, max_wait)
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def admit(self, cost: int = 1) -> Iterator[None]:
+        cost = max(1, min(cost, self.capacity))
+        ticket = object()
+
+        with self._condition:
+            if not self._queue and self._fits(cost):
+                self._in_use += cost
+            else:
+                if len(self._queue) >= self.max_queue:
+                    raise Overloaded(self.name, self.retry_after())
+
+                self._queue.append(ticket)
+                deadline = time.monotonic() + self.max_wait
+                try:
+                    while self._queue[0] is not ticket or not self._fits(cost):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Overloaded(self.name, self.retry_after())
+                        self._condition.wait(remaining)
+                finally:
+                    self._queue.remove(ticket)
+                    # The next request in line may fit now, or may have become
+                    # the head of the queue because this one gave up.
+                    self._condition.notify_all()
+                self._in_use += cost
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._release(cost, started)
+                self._condition.notify_all()
+
+
+class AsyncAdmissionGate(_Gate):
+    """
+    The asyncio counterpart of `AdmissionGate`, for routes served on one event
+    loop: waiting requests suspend instead of blocking a thread.
+    """
+
+    def __init__(
+        self, name: str, capacity: int, max_queue: int, max_wait: float
+    ) -> None:
+        super().__init__(name, capacity, max_queue, max_wait)
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def admit(self, cost: int = 1) -> AsyncIterator[None]:
+        cost = max(1, min(cost, self.capacity))
+        ticket = object()
+
+        async with self._condition:
+            if not self._queue and self._fits(cost):
+                self._in_use += cost
+            else:
+                if len(self._queue) >= self.max_queue:
+                    raise Overloaded(self.name, self.retry_after())
+
+                self._queue.append(ticket)
+                deadline = time.monotonic() + self.max_wait
+                try:
+                    while self._queue[0] is not ticket or not self._fits(cost):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise Overloaded(self.name, self.retry_after())
+                        try:
+                            await asyncio.wait_for(self._condition.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    self._queue.remove(ticket)
+                    self._condition.notify_all()
+                self._in_use += cost
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            # Released before awaiting the lock, so a cancelled request cannot
+            # keep its cost; everything runs on one loop, so no lock is needed.
+            self._release(cost, started)
+            async with self._condition:
+                self._condition.notify_all()
+
+
+def estimate_cost(track_total: int, tracks_per_unit: int) -> int:
+    """Weights a request by the size of the library it has to page through."""
+    return 1 + track_total // tracks_per_unit
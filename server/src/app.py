@@ -1,24 +1,148 @@
 import os
+from datetime import date
 from io import BytesIO
-from typing import Any, Dict, List, Optional, Union, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union, cast
 
-import spotipy
 from flask import Flask, Response, jsonify, make_response, request, send_file
 from flask_cors import CORS
 
-from . import auth, image_utils, spotify_utils
+from . import auth, checkpoints
+from .admission import AdmissionGate, Overloaded, estimate_cost
+from .coalesce import SingleFlight
+from .compression import register_compression
+from .json_provider import init_json_provider
+from .lazy import ensure_loaded, lazy_import
 from .models.spotify_types import (
     SimplifiedPlaylist,
     UserProfile,
 )
+from .store import KeyValueStore, get_store
+
+if TYPE_CHECKING:
+    from spotipy import Spotify
+
+    from .models.spotify_types import MutationPlan
+    from .track_index import TrackIndex
+
+# Heavy subsystems are loaded on first use so workers that only serve auth
+# traffic start quickly. Call `warm_up` to load them ahead of traffic instead.
+spotipy = lazy_import("spotipy")
+image_utils = lazy_import(f"{__package__}.image_utils")
+planner = lazy_import(f"{__package__}.planner")
+preview_index = lazy_import(f"{__package__}.preview_index")
+spotify_utils = lazy_import(f"{__package__}.spotify_utils")
+track_index = lazy_import(f"{__package__}.track_index")
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
+init_json_provider(app)
+register_compression(app)
 
 app.config["SPOTIFY_CLIENT_ID"] = os.getenv("SPOTIFY_CLIENT_ID")
 app.config["SPOTIFY_CLIENT_SECRET"] = os.getenv("SPOTIFY_CLIENT_SECRET")
 app.config["SPOTIFY_REDIRECT_URI"] = os.getenv("SPOTIFY_REDIRECT_URI")
 
+# Bulk create bodies carry every song of every selected month.
+app.config["MAX_CONTENT_LENGTH"] = int(
+    os.getenv("MONTHLIFY_MAX_CONTENT_LENGTH", str(8 * 1024 * 1024))
+)
+
+app.config["TRACK_INDEX_TTL_SECONDS"] = int(
+    os.getenv("MONTHLIFY_TRACK_INDEX_TTL_SECONDS", "600")
+)
+
+# Public playlist indexes are only shared across users when Redis backs the store:
+# in worker memory every previewed playlist would be kept for the whole TTL.
+app.config["SHARED_TRACK_INDEX_ENABLED"] = (
+    os.getenv(
+        "MONTHLIFY_SHARED_TRACK_INDEX",
+        "1" if os.getenv("MONTHLIFY_REDIS_URL") else "0",
+    )
+    == "1"
+)
+app.config["SHARED_TRACK_INDEX_TTL_SECONDS"] = int(
+    os.getenv("MONTHLIFY_SHARED_TRACK_INDEX_TTL_SECONDS", str(60 * 60 * 24))
+)
+
+app.config["PREVIEW_INDEX_ENABLED"] = os.getenv("MONTHLIFY_PREVIEW_INDEX") == "1"
+app.config["PREVIEW_INDEX_REFRESH_SECONDS"] = int(
+    os.getenv("MONTHLIFY_PREVIEW_INDEX_REFRESH_SECONDS", "3600")
+)
+app.config["PREVIEW_INDEX_MAX_CONCURRENCY"] = int(
+    os.getenv("MONTHLIFY_PREVIEW_INDEX_MAX_CONCURRENCY", "2")
+)
+
+# Expensive routes get their own concurrency budget, in cost units, so a few
+# huge libraries cannot take every worker away from the cheap endpoints.
+app.config["PREVIEW_CAPACITY"] = int(os.getenv("MONTHLIFY_PREVIEW_CAPACITY", "8"))
+app.config["CREATE_CAPACITY"] = int(os.getenv("MONTHLIFY_CREATE_CAPACITY", "4"))
+app.config["COVER_CAPACITY"] = int(os.getenv("MONTHLIFY_COVER_CAPACITY", "4"))
+app.config["ADMISSION_QUEUE_SIZE"] = int(
+    os.getenv("MONTHLIFY_ADMISSION_QUEUE_SIZE", "16")
+)
+app.config["ADMISSION_MAX_WAIT_SECONDS"] = float(
+    os.getenv("MONTHLIFY_ADMISSION_MAX_WAIT_SECONDS", "5")
+)
+app.config["TRACKS_PER_COST_UNIT"] = int(
+    os.getenv("MONTHLIFY_TRACKS_PER_COST_UNIT", "2000")
+)
+
+preview_gate, create_gate, cover_gate = (
+    AdmissionGate(
+        name,
+        capacity=app.config[f"{name.upper()}_CAPACITY"],
+        max_queue=app.config["ADMISSION_QUEUE_SIZE"],
+        max_wait=app.config["ADMISSION_MAX_WAIT_SECONDS"],
+    )
+    for name in ("preview", "create", "cover")
+)
+
+# Bulk creates whose plan needs more Spotify calls than this are rejected,
+# so one request cannot use up the app's rate limit.
+app.config["MAX_PLAN_CALLS"] = int(os.getenv("MONTHLIFY_MAX_PLAN_CALLS", "600"))
+
+# Collapses identical in-flight library fetches within this process.
+index_fetches: "SingleFlight[TrackIndex]" = SingleFlight()
+
+
+def warm_up() -> None:
+    """
+    Loads the lazily imported subsystems and fills the font and store caches,
+    so the first request a worker serves does not pay for them.
+    Runs at import when MONTHLIFY_WARM_UP=1, or can be called from a server hook
+    such as gunicorn's `post_fork`.
+    """
+    ensure_loaded(
+        spotipy, image_utils, planner, preview_index, spotify_utils, track_index
+    )
+    auth.warm_up()
+    image_utils.preload_fonts()
+    spotify_utils.get_month_name(1)
+    get_store()
+
+
+if os.getenv("MONTHLIFY_WARM_UP") == "1":
+    warm_up()
+
+if app.config["PREVIEW_INDEX_ENABLED"]:
+    preview_index.PreviewIndexScheduler(
+        store=get_store(),
+        client_id=cast(str, app.config["SPOTIFY_CLIENT_ID"]),
+        client_secret=cast(str, app.config["SPOTIFY_CLIENT_SECRET"]),
+        refresh_interval=app.config["PREVIEW_INDEX_REFRESH_SECONDS"],
+        max_concurrent_refreshes=app.config["PREVIEW_INDEX_MAX_CONCURRENCY"],
+    ).start()
+
+
+@app.errorhandler(Overloaded)
+def handle_overloaded(e: Overloaded) -> tuple[Response, int]:
+    print(f"Shedding load: {e}")
+    response = make_response(
+        jsonify({"error": "The server is busy, please try again shortly."})
+    )
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
 
 @app.route("/")
 def home() -> Dict[str, str]:
@@ -82,6 +206,13 @@ def spotify_callback() -> tuple[Response, int]:
 
 @app.route("/api/auth/logout", methods=["POST"])
 def logout() -> tuple[Response, int]:
+    """
+    Clears the auth cookies and stops background refreshes of the user's
+    preview index, so their stored refresh token is no longer used.
+    """
+    if app.config["PREVIEW_INDEX_ENABLED"]:
+        stop_background_refreshes()
+
     resp = make_response(jsonify({"message": "Logged out"}))
 
     resp.set_cookie(
@@ -105,6 +236,27 @@ def logout() -> tuple[Response, int]:
     return resp, 200
 
 
+def stop_background_refreshes() -> None:
+    """
+    Opts the user logging out of background refreshes. They are identified by
+    their access token, or by their refresh token once the access token expired.
+    """
+    store = get_store()
+    access_token = request.cookies.get("spotify_access_token")
+    refresh_token = request.cookies.get("spotify_refresh_token")
+
+    if access_token:
+        try:
+            user_id = spotipy.Spotify(auth=access_token).me()["id"]
+            preview_index.opt_out(store, user_id)
+            return
+        except Exception as e:
+            print(f"Could not identify the user logging out: {e}")
+
+    if refresh_token:
+        preview_index.opt_out_refresh_token(store, refresh_token)
+
+
 @app.route("/api/spotify/playlists", methods=["GET"])
 def get_user_playlists() -> tuple[Response, int]:
     """
@@ -185,6 +337,8 @@ def preview_playlist() -> tuple[Response, int]:
     """
     Fetches a preview of monthly playlists
     from a given Spotify playlist URL, ID, or liked songs.
+    An optional `granularity` (week, month, quarter or year) and inclusive
+    `start`/`end` dates (YYYY-MM-DD) select other periods or a date range.
     """
     access_token = request.cookies.get("spotify_access_token")
 
@@ -206,20 +360,37 @@ def preview_playlist() -> tuple[Response, int]:
                 400,
             )
 
+        granularity: str = data.get("granularity", "month")
+        if granularity not in track_index.GRANULARITIES:
+            return make_response(jsonify({"error": "Invalid granularity"})), 400
+
+        try:
+            start = date.fromisoformat(data["start"]) if data.get("start") else None
+            end = date.fromisoformat(data["end"]) if data.get("end") else None
+        except ValueError:
+            return make_response(jsonify({"error": "Invalid date range"})), 400
+
+        source_id: Optional[str]
         if identifier_type == "id":
-            if identifier == "liked-songs":
-                preview_data = spotify_utils.get_monthly_previews_from_liked_songs(sp)
-            else:
-                preview_data = spotify_utils.get_monthly_previews_from_id(
-                    sp, identifier
-                )
+            source_id = identifier
         elif identifier_type == "url":
-            preview_data = spotify_utils.get_monthly_previews_from_url(sp, identifier)
+            if "spotify.com/playlist/" not in identifier:
+                raise ValueError("Invalid Spotify playlist URL.")
+            source_id = spotify_utils.extract_playlist_id(identifier)
+            if not source_id:
+                raise ValueError("Invalid Spotify playlist URL.")
         else:
             return make_response(jsonify({"error": "Invalid identifier type"})), 400
 
+        index = get_source_index(sp, source_id)
+        preview_data = track_index.format_period_preview(
+            index.group(granularity, start, end), granularity
+        )
+
         return make_response(jsonify({"preview_data": preview_data})), 200
 
+    except Overloaded:
+        raise
     except spotipy.exceptions.SpotifyException as e:
         print(f"Spotify API Error: {e}")
         return make_response(jsonify({"error": "Spotify API Error: " + str(e)})), 401
@@ -228,6 +399,156 @@ def preview_playlist() -> tuple[Response, int]:
         return make_response(jsonify({"error": "An unexpected error occurred."})), 500
 
 
+def get_playlist_index(
+    sp: "Spotify", store: KeyValueStore, playlist_id: str, playlist: Dict[str, Any]
+) -> "TrackIndex":
+    """
+    Indexes a playlist at the snapshot of `playlist`. Identical in-flight fetches
+    share one upstream pagination, and public playlists are read from and written
+    to a cache shared by all users when SHARED_TRACK_INDEX_ENABLED.
+    """
+    snapshot_id = playlist["snapshot_id"]
+    is_shared = (
+        bool(playlist.get("public")) and app.config["SHARED_TRACK_INDEX_ENABLED"]
+    )
+
+    if is_shared:
+        index = track_index.get_shared_index(store, playlist_id, snapshot_id)
+        if index is not None:
+            return index
+
+    def fetch() -> "TrackIndex":
+        first_page = spotify_utils.fetch_playlist_first_page(sp, playlist_id)
+        with preview_gate.admit(track_cost(first_page["total"])):
+            index = track_index.TrackIndex.from_items(
+                spotify_utils.fetch_playlist_tracks(sp, playlist_id, first_page)
+            )
+        if is_shared:
+            track_index.save_shared_index(
+                store,
+                playlist_id,
+                snapshot_id,
+                index,
+                ttl=app.config["SHARED_TRACK_INDEX_TTL_SECONDS"],
+            )
+        return index
+
+    return index_fetches.do(f"playlist:{playlist_id}:{snapshot_id}", fetch)
+
+
+def track_cost(track_total: int) -> int:
+    return estimate_cost(track_total, app.config["TRACKS_PER_COST_UNIT"])
+
+
+def fetch_liked_songs_index(sp: "Spotify", first_page: Dict[str, Any]) -> "TrackIndex":
+    """
+    Indexes the user's liked songs. The first page tells how large the library is,
+    and the rest is only paged through once the preview gate admits that cost.
+    """
+    with preview_gate.admit(track_cost(first_page["total"])):
+        return track_index.TrackIndex.from_items(
+            spotify_utils.fetch_liked_songs(sp, first_page)
+        )
+
+
+def get_source_index(sp: "Spotify", source_id: str) -> "TrackIndex":
+    """
+    Returns the tracks of a playlist or the liked songs sorted by date added.
+    The index is cached per user and source for TRACK_INDEX_TTL_SECONDS, so
+    previews at other granularities or date ranges do not refetch the library.
+    Opted-in users' liked songs come from their precomputed index when it is fresh.
+    Both are keyed on the source's current version, a playlist's snapshot ID or
+    the liked songs' first page, so they are never served once the source changes.
+    """
+    store = get_store()
+    user_id = sp.me()["id"]
+    is_liked_songs = source_id == "liked-songs"
+    use_preview_index = is_liked_songs and app.config["PREVIEW_INDEX_ENABLED"]
+
+    if is_liked_songs:
+        first_page = spotify_utils.fetch_liked_songs_first_page(sp)
+        version = spotify_utils.get_liked_songs_version(first_page)
+    else:
+        playlist = sp.playlist(source_id, fields="snapshot_id,public")
+        version = playlist["snapshot_id"]
+
+    if use_preview_index:
+        index = preview_index.get_fresh_index(
+            store,
+            user_id,
+            max_age=2 * app.config["PREVIEW_INDEX_REFRESH_SECONDS"],
+            version=version,
+        )
+        if index is not None:
+            return index
+
+    index = track_index.get_cached_index(store, user_id, source_id, version)
+    if index is not None:
+        return index
+
+    if is_liked_songs:
+        index = index_fetches.do(
+            f"liked-songs:{user_id}:{version}",
+            lambda: fetch_liked_songs_index(sp, first_page),
+        )
+    else:
+        index = get_playlist_index(sp, store, source_id, playlist)
+
+    track_index.save_cached_index(
+        store,
+        user_id,
+        source_id,
+        version,
+        index,
+        ttl=app.config["TRACK_INDEX_TTL_SECONDS"],
+    )
+    if use_preview_index and preview_index.is_opted_in(store, user_id):
+        preview_index.save_index(store, user_id, index, version)
+
+    return index
+
+
+@app.route("/api/preview/index", methods=["POST", "DELETE"])
+def manage_preview_index() -> tuple[Response, int]:
+    """
+    Opts the user in to (POST) or out of (DELETE)
+    background refreshes of their liked songs month index.
+    """
+    access_token = request.cookies.get("spotify_access_token")
+    refresh_token = request.cookies.get("spotify_refresh_token")
+
+    if not access_token or not refresh_token:
+        return (
+            make_response(jsonify({"error": "Authorization cookie is missing."})),
+            401,
+        )
+
+    if not app.config["PREVIEW_INDEX_ENABLED"]:
+        return (
+            make_response(jsonify({"error": "Preview indexing is not enabled."})),
+            404,
+        )
+
+    try:
+        sp = spotipy.Spotify(auth=access_token)
+        user_id = sp.me()["id"]
+        store = get_store()
+
+        if request.method == "DELETE":
+            preview_index.opt_out(store, user_id)
+            return make_response(jsonify({"message": "Opted out"})), 200
+
+        preview_index.opt_in(store, user_id, refresh_token)
+        return make_response(jsonify({"message": "Opted in"})), 200
+
+    except spotipy.exceptions.SpotifyException as e:
+        print(f"Spotify API Error: {e}")
+        return make_response(jsonify({"error": str(e)})), 401
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        return make_response(jsonify({"error": "An unexpected error occurred."})), 500
+
+
 @app.route("/api/images/cover/<month_code>/<year>", methods=["GET"])
 def get_playlist_cover(
     month_code: str, year: str
@@ -236,11 +557,12 @@ def get_playlist_cover(
     API endpoint to generate and serve a playlist cover image.
     """
     try:
-        img = image_utils.create_playlist_cover(month_code.upper(), int(year))
+        with cover_gate.admit():
+            img = image_utils.create_playlist_cover(month_code.upper(), int(year))
 
-        img_io = BytesIO()
-        img.save(img_io, "PNG")
-        img_io.seek(0)
+            img_io = BytesIO()
+            img.save(img_io, "PNG")
+            img_io.seek(0)
 
         return send_file(img_io, mimetype="image/png")
 
@@ -248,13 +570,65 @@ def get_playlist_cover(
         return make_response(jsonify({"error": "Invalid month or year format"})), 400
 
 
-@app.route("/api/create-monthly-playlists", methods=["POST"])
-def create_monthly_playlists() -> tuple[Response, int]:
+def get_create_request_error(data: Dict[str, Any]) -> Optional[str]:
+    """Validates the body shared by the bulk create and plan endpoints."""
+    if not data.get("playlists"):
+        return "Missing 'playlists' data in the request body."
+    if not data.get("identifier") or not data.get("type"):
+        return "Missing 'identifier' or 'identifier_type' in the request body."
+    if data["type"] not in ("id", "url"):
+        return "Invalid identifier type"
+    return None
+
+
+def get_source_playlist_name(sp: "Spotify", identifier: str) -> Optional[str]:
+    if identifier == "liked-songs":
+        return "Liked Songs"
+    return cast(
+        Optional[str], spotify_utils.get_playlist_name_from_identifier(sp, identifier)
+    )
+
+
+def get_idempotency_key(data: Dict[str, Any]) -> str:
+    return request.headers.get("Idempotency-Key") or checkpoints.derive_idempotency_key(
+        data["identifier"], data["playlists"]
+    )
+
+
+def plan_request(
+    sp: "Spotify",
+    user_id: str,
+    data: Dict[str, Any],
+    progress: checkpoints.CreateCheckpoints,
+) -> Union["MutationPlan", tuple[Response, int]]:
     """
-    API endpoint to create:
-        multiple new playlists
-        add tracks
-        and upload a custom cover image to each.
+    Plans a bulk create request, or returns the error response if its source
+    cannot be resolved.
+    """
+    source_playlist_name = get_source_playlist_name(sp, data["identifier"])
+    if not source_playlist_name:
+        return (
+            make_response(
+                jsonify({"error": "Could not determine source playlist name."})
+            ),
+            400,
+        )
+
+    return planner.plan_monthly_playlists(
+        sp, user_id, source_playlist_name, data["playlists"], progress, get_store()
+    )
+
+
+def exceeds_call_budget(plan: "MutationPlan") -> bool:
+    return plan["read_calls"] + plan["write_calls"] > app.config["MAX_PLAN_CALLS"]
+
+
+@app.route("/api/create-monthly-playlists/plan", methods=["POST"])
+def plan_monthly_playlists() -> tuple[Response, int]:
+    """
+    Dry run of the bulk create: returns how many writes it would make to each
+    playlist, with the estimated number of Spotify calls and time, without
+    changing anything.
     """
     access_token = request.cookies.get("spotify_access_token")
 
@@ -265,117 +639,130 @@ def create_monthly_playlists() -> tuple[Response, int]:
         )
 
     data = request.get_json()
-    monthly_playlists_details: List[Dict[str, Any]] = data.get("playlists", [])
-    identifier: Optional[str] = data.get("identifier")
-    identifier_type: Optional[str] = data.get("type")
-
-    if not monthly_playlists_details:
-        return (
-            make_response(
-                jsonify({"error": "Missing 'playlists' data in the request body."})
-            ),
-            400,
-        )
+    error = get_create_request_error(data)
+    if error:
+        return make_response(jsonify({"error": error})), 400
 
-    if not identifier or not identifier_type:
-        return (
-            make_response(
-                jsonify(
-                    {
-                        "error": (
-                            "Missing 'identifier' or 'identifier_type' "
-                            "in the request body."
-                        )
-                    }
-                )
-            ),
-            400,
-        )
+    idempotency_key = get_idempotency_key(data)
 
     try:
-        sp = spotipy.Spotify(auth=access_token)
-        user_id = sp.me()["id"]
-
-        source_playlist_name: Optional[str]
-        if identifier_type == "id":
-            if identifier == "liked-songs":
-                source_playlist_name = "Liked Songs"
-            else:
-                source_playlist_name = spotify_utils.get_playlist_name_from_identifier(
-                    sp, identifier
-                )
-        elif identifier_type == "url":
-            source_playlist_name = spotify_utils.get_playlist_name_from_identifier(
-                sp, identifier
+        with create_gate.admit():
+            sp = spotipy.Spotify(auth=access_token)
+            user_id = sp.me()["id"]
+            progress = checkpoints.CreateCheckpoints(
+                get_store(), user_id, idempotency_key
             )
-        else:
-            return make_response(jsonify({"error": "Invalid identifier type"})), 400
+            plan = plan_request(sp, user_id, data, progress)
+            if isinstance(plan, tuple):
+                return plan
 
-        if not source_playlist_name:
             return (
                 make_response(
-                    jsonify({"error": "Could not determine source playlist name."})
+                    jsonify(
+                        {
+                            "plan": planner.summarize_plan(plan),
+                            "idempotency_key": idempotency_key,
+                            "max_calls": app.config["MAX_PLAN_CALLS"],
+                            "within_budget": not exceeds_call_budget(plan),
+                        }
+                    )
                 ),
-                400,
+                200,
             )
+    except Overloaded:
+        raise
+    except spotipy.exceptions.SpotifyException as e:
+        print(f"Spotify API Error: {e}")
+        return make_response(jsonify({"error": "Spotify API Error: " + str(e)})), 401
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        return make_response(jsonify({"error": "An unexpected error occurred."})), 500
 
-        successful_playlists: List[Dict[str, Any]] = []
-        for playlist_data in monthly_playlists_details:
-            playlist_name = playlist_data.get("name")
-            songs_list = playlist_data.get("songs", [])
-
-            if not playlist_name:
-                continue
-
-            track_uris = [song["id"] for song in songs_list if "id" in song]
-
-            if not track_uris:
-                continue
 
-            result_dict = spotify_utils.create_playlist_with_tracks(
-                sp=sp,
-                user_id=user_id,
-                source_playlist_name=source_playlist_name,
-                playlist_name=playlist_name,
-                track_uris=track_uris,
-            )
+@app.route("/api/create-monthly-playlists", methods=["POST"])
+def create_monthly_playlists() -> tuple[Response, int]:
+    """
+    API endpoint to create:
+        multiple new playlists
+        add tracks
+        and upload a custom cover image to each.
+    The request is planned first and only the planned writes are made; plans
+    over MAX_PLAN_CALLS Spotify calls are rejected with 422 and have to be split.
+    Progress is checkpointed per month under the `Idempotency-Key` header
+    (or a key derived from the request body), so a retry resumes where it failed.
+    """
+    access_token = request.cookies.get("spotify_access_token")
 
-            new_playlist = result_dict["playlist"]
-            action_taken = result_dict["action_taken"]
+    if not access_token:
+        return (
+            make_response(jsonify({"error": "Authorization cookie is missing."})),
+            401,
+        )
 
-            name_parts = playlist_name.split()
-            month_code = name_parts[0][:3].upper()
-            year = name_parts[1]
+    data = request.get_json()
+    error = get_create_request_error(data)
+    if error:
+        return make_response(jsonify({"error": error})), 400
 
-            img = image_utils.create_playlist_cover(month_code, int(year))
-            img_io = BytesIO()
-            img.save(img_io, "JPEG", quality=85, optimize=True)
-            img_io.seek(0)
+    idempotency_key = get_idempotency_key(data)
+    song_total = sum(len(p.get("songs", [])) for p in data["playlists"])
 
-            spotify_utils.upload_playlist_cover_image(sp, new_playlist["id"], img_io)
+    try:
+        with create_gate.admit(track_cost(song_total)):
+            sp = spotipy.Spotify(auth=access_token)
+            user_id = sp.me()["id"]
+            progress = checkpoints.CreateCheckpoints(
+                get_store(), user_id, idempotency_key
+            )
+            plan = plan_request(sp, user_id, data, progress)
+            if isinstance(plan, tuple):
+                return plan
+
+            if exceeds_call_budget(plan):
+                return (
+                    make_response(
+                        jsonify(
+                            {
+                                "error": (
+                                    "This request needs too many Spotify calls. "
+                                    "Split it into requests with fewer months."
+                                ),
+                                "read_calls": plan["read_calls"],
+                                "write_calls": plan["write_calls"],
+                                "max_calls": app.config["MAX_PLAN_CALLS"],
+                            }
+                        )
+                    ),
+                    422,
+                )
 
-            successful_playlists.append(
-                {
-                    "name": new_playlist["name"],
-                    "id": new_playlist["id"],
-                    "url": new_playlist["external_urls"]["spotify"],
-                    "action": action_taken,
-                }
+            successful_playlists = planner.execute_plan(
+                sp, user_id, plan, progress, get_store()
             )
+            # Every month is done, so repeating this request starts afresh
+            # from the user's current playlists instead of the old checkpoints.
+            progress.clear()
 
+            return (
+                make_response(
+                    jsonify(
+                        {
+                            "message": "Playlists processed successfully!",
+                            "playlists": successful_playlists,
+                        }
+                    )
+                ),
+                201,
+            )
+    except Overloaded:
+        raise
+    except Exception as e:
         return (
             make_response(
-                jsonify(
-                    {
-                        "message": "Playlists processed successfully!",
-                        "playlists": successful_playlists,
-                    }
-                )
+                jsonify({"error": str(e), "idempotency_key": idempotency_key})
             ),
-            201,
+            500,
         )
-    except Exception as e:
-        return make_response(jsonify({"error": str(e)})), 500
 
 
 if __name__ == "__main__":
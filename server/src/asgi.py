@@ -0,0 +1,406 @@
+"""
+Async (ASGI) serving mode.
+
+The read-heavy Spotify routes, /api/preview and /api/spotify/playlists, run on
+an asyncio HTTP client with a shared connection pool, so a single process can
+hold hundreds of in-flight previews while they wait on the network.
+
+Every other route is served by the regular Flask app through Hypercorn's WSGI
+middleware, on its thread pool. That includes bulk creates and their dry run,
+which are write-bound and rely on the Flask app's planner, checkpoints and
+admission gate, and cover images, which are rendered in those threads rather
+than in a process pool of the async app's own.
+
+Run with:
+    hypercorn src.asgi:app
+"""
+
+import asyncio
+import os
+import re
+from datetime import date
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    cast,
+)
+
+import httpx
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from hypercorn.typing import ASGIReceiveCallable, ASGISendCallable, Scope
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+from spotipy.exceptions import SpotifyException
+
+from . import async_spotify, preview_index, spotify_utils, track_index
+from .admission import AsyncAdmissionGate, Overloaded, estimate_cost
+from .app import app as flask_app
+from .compression import (
+    COMPRESSIBLE_MIMETYPES,
+    choose_encoding,
+    compress_body,
+    get_min_size,
+)
+from .json_provider import init_json_provider
+from .models.spotify_types import SimplifiedPlaylist
+from .store import KeyValueStore, get_store
+
+async_app = Quart(__name__)
+async_app = cors(async_app, allow_origin=re.compile(r".*"), allow_credentials=True)
+
+init_json_provider(async_app)
+
+T = TypeVar("T")
+
+async_app.config["MAX_CONNECTIONS"] = int(os.getenv("MONTHLIFY_MAX_CONNECTIONS", "200"))
+
+# Previews share the Flask app's preview budget settings, enforced on the loop.
+preview_gate = AsyncAdmissionGate(
+    "preview",
+    capacity=flask_app.config["PREVIEW_CAPACITY"],
+    max_queue=flask_app.config["ADMISSION_QUEUE_SIZE"],
+    max_wait=flask_app.config["ADMISSION_MAX_WAIT_SECONDS"],
+)
+
+
+class AsyncSingleFlight(Generic[T]):
+    """
+    The asyncio counterpart of `coalesce.SingleFlight`, for a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "asyncio.Future[T]"] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+
+            def forget(_: Any) -> None:
+                self._calls.pop(key, None)
+
+            future.add_done_callback(forget)
+
+        # A cancelled caller must not cancel the fetch other callers are awaiting.
+        return await asyncio.shield(future)
+
+
+http_client: Optional[httpx.AsyncClient] = None
+index_fetches: "AsyncSingleFlight[track_index.TrackIndex]" = AsyncSingleFlight()
+
+
+@async_app.before_serving
+async def start_resources() -> None:
+    global http_client
+    http_client = async_spotify.create_http_client(
+        max_connections=async_app.config["MAX_CONNECTIONS"]
+    )
+
+
+@async_app.after_serving
+async def stop_resources() -> None:
+    if http_client is not None:
+        await http_client.aclose()
+
+
+@async_app.after_request
+async def compress_response(response: Response) -> Response:
+    """
+    Compresses large JSON responses; mirrors `compression.register_compression`.
+    Compression runs in a thread so big payloads do not stall the event loop.
+    """
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    data = await response.get_data(as_text=False)
+    if len(data) < get_min_size():
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    response.set_data(await asyncio.to_thread(compress_body, data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+@async_app.errorhandler(Overloaded)
+async def handle_overloaded(e: Overloaded) -> tuple[Response, int]:
+    """Mirrors the Flask app's handler: 503 with a Retry-After hint."""
+    print(f"Shedding load: {e}")
+    response = jsonify({"error": "The server is busy, please try again shortly."})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+
+def track_cost(track_total: int) -> int:
+    return estimate_cost(track_total, flask_app.config["TRACKS_PER_COST_UNIT"])
+
+
+def get_spotify_client(access_token: str) -> async_spotify.AsyncSpotify:
+    assert http_client is not None, "HTTP client is not started."
+    return async_spotify.AsyncSpotify(http_client, access_token)
+
+
+@async_app.route("/api/spotify/playlists", methods=["GET"])
+async def get_user_playlists() -> tuple[Response, int]:
+    """
+    Fetches all of the user's playlists, including liked songs.
+    """
+    access_token = request.cookies.get("spotify_access_token")
+
+    if not access_token:
+        return jsonify({"error": "Authorization cookie is missing."}), 401
+
+    try:
+        sp = get_spotify_client(access_token)
+
+        playlists, liked_songs_playlist = await asyncio.gather(
+            async_spotify.get_all_user_playlists(sp),
+            async_spotify.get_liked_songs_as_playlist(sp),
+        )
+
+        all_playlists = [liked_songs_playlist] + playlists
+
+        playlists_data: List[SimplifiedPlaylist] = [
+            {
+                "id": p["id"],
+                "name": p["name"],
+                "owner": p["owner"]["display_name"],
+                "track_count": p["tracks"]["total"],
+                "image_url": p["images"][0]["url"] if p["images"] else None,
+            }
+            for p in all_playlists
+        ]
+
+        return jsonify({"playlists": playlists_data}), 200
+
+    except SpotifyException as e:
+        print(f"Spotify API Error: {e}")
+        return jsonify({"error": str(e)}), 401
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+async def get_playlist_index(
+    sp: async_spotify.AsyncSpotify,
+    store: KeyValueStore,
+    playlist_id: str,
+    playlist: Dict[str, Any],
+) -> track_index.TrackIndex:
+    """
+    Async counterpart of the Flask app's `get_playlist_index`: identical in-flight
+    fetches are coalesced and public playlists use the shared cache when enabled.
+    """
+    snapshot_id = playlist["snapshot_id"]
+    is_shared = (
+        bool(playlist.get("public")) and flask_app.config["SHARED_TRACK_INDEX_ENABLED"]
+    )
+
+    if is_shared:
+        index = await asyncio.to_thread(
+            track_index.get_shared_index, store, playlist_id, snapshot_id
+        )
+        if index is not None:
+            return index
+
+    async def fetch() -> track_index.TrackIndex:
+        first_page = await async_spotify.fetch_playlist_first_page(sp, playlist_id)
+        async with preview_gate.admit(track_cost(first_page["total"])):
+            items = await async_spotify.fetch_playlist_tracks(
+                sp, playlist_id, first_page
+            )
+        index = await asyncio.to_thread(track_index.TrackIndex.from_items, items)
+        if is_shared:
+            await asyncio.to_thread(
+                track_index.save_shared_index,
+                store,
+                playlist_id,
+                snapshot_id,
+                index,
+                flask_app.config["SHARED_TRACK_INDEX_TTL_SECONDS"],
+            )
+        return index
+
+    return await index_fetches.do(f"playlist:{playlist_id}:{snapshot_id}", fetch)
+
+
+async def get_source_index(
+    sp: async_spotify.AsyncSpotify, source_id: str
+) -> track_index.TrackIndex:
+    """
+    Async counterpart of the Flask app's `get_source_index`: returns the tracks of
+    a playlist or the liked songs sorted by date added, using the same caches.
+    """
+    store = get_store()
+    user_id = (await sp.me())["id"]
+    is_liked_songs = source_id == "liked-songs"
+    use_preview_index = is_liked_songs and flask_app.config["PREVIEW_INDEX_ENABLED"]
+
+    if is_liked_songs:
+        first_page = await async_spotify.fetch_liked_songs_first_page(sp)
+        version = spotify_utils.get_liked_songs_version(first_page)
+    else:
+        playlist = await sp.playlist(source_id, fields="snapshot_id,public")
+        version = playlist["snapshot_id"]
+
+    if use_preview_index:
+        index = await asyncio.to_thread(
+            preview_index.get_fresh_index,
+            store,
+            user_id,
+            2 * flask_app.config["PREVIEW_INDEX_REFRESH_SECONDS"],
+            version,
+        )
+        if index is not None:
+            return index
+
+    index = await asyncio.to_thread(
+        track_index.get_cached_index, store, user_id, source_id, version
+    )
+    if index is not None:
+        return index
+
+    if is_liked_songs:
+
+        async def fetch_liked_songs() -> track_index.TrackIndex:
+            async with preview_gate.admit(track_cost(first_page["total"])):
+                items = await async_spotify.fetch_liked_songs(sp, first_page)
+            return await asyncio.to_thread(track_index.TrackIndex.from_items, items)
+
+        index = await index_fetches.do(
+            f"liked-songs:{user_id}:{version}", fetch_liked_songs
+        )
+    else:
+        index = await get_playlist_index(sp, store, source_id, playlist)
+
+    await asyncio.to_thread(
+        track_index.save_cached_index,
+        store,
+        user_id,
+        source_id,
+        version,
+        index,
+        flask_app.config["TRACK_INDEX_TTL_SECONDS"],
+    )
+    if use_preview_index and await asyncio.to_thread(
+        preview_index.is_opted_in, store, user_id
+    ):
+        await asyncio.to_thread(
+            preview_index.save_index, store, user_id, index, version
+        )
+
+    return index
+
+
+def render_preview(
+    index: track_index.TrackIndex,
+    granularity: str,
+    start: Optional[date],
+    end: Optional[date],
+) -> Response:
+    """
+    Groups and serializes a preview. This is CPU-bound on large libraries,
+    so the route runs it in a thread to keep the event loop free.
+    """
+    preview_data = track_index.format_period_preview(
+        index.group(granularity, start, end), granularity
+    )
+    return cast(Response, async_app.json.response({"preview_data": preview_data}))
+
+
+@async_app.route("/api/preview", methods=["POST"])
+async def preview_playlist() -> tuple[Response, int]:
+    """
+    Fetches a preview of monthly playlists
+    from a given Spotify playlist URL, ID, or liked songs.
+    An optional `granularity` (week, month, quarter or year) and inclusive
+    `start`/`end` dates (YYYY-MM-DD) select other periods or a date range.
+    """
+    access_token = request.cookies.get("spotify_access_token")
+
+    if not access_token:
+        return jsonify({"error": "Authorization cookie is missing."}), 401
+
+    try:
+        sp = get_spotify_client(access_token)
+        data = await request.get_json()
+        identifier: Optional[str] = data.get("identifier")
+        identifier_type: Optional[str] = data.get("type")
+
+        if not identifier or not identifier_type:
+            return jsonify({"error": "Playlist identifier is required"}), 400
+
+        granularity: str = data.get("granularity", "month")
+        if granularity not in track_index.GRANULARITIES:
+            return jsonify({"error": "Invalid granularity"}), 400
+
+        try:
+            start = date.fromisoformat(data["start"]) if data.get("start") else None
+            end = date.fromisoformat(data["end"]) if data.get("end") else None
+        except ValueError:
+            return jsonify({"error": "Invalid date range"}), 400
+
+        source_id: Optional[str]
+        if identifier_type == "id":
+            source_id = identifier
+        elif identifier_type == "url":
+            if "spotify.com/playlist/" not in identifier:
+                raise ValueError("Invalid Spotify playlist URL.")
+            source_id = spotify_utils.extract_playlist_id(identifier)
+            if not source_id:
+                raise ValueError("Invalid Spotify playlist URL.")
+        else:
+            return jsonify({"error": "Invalid identifier type"}), 400
+
+        index = await get_source_index(sp, source_id)
+        response = await asyncio.to_thread(
+            render_preview, index, granularity, start, end
+        )
+        return response, 200
+
+    except Overloaded:
+        raise
+    except SpotifyException as e:
+        print(f"Spotify API Error: {e}")
+        return jsonify({"error": "Spotify API Error: " + str(e)}), 401
+    except Exception as e:
+        print(f"Unexpected Error: {e}")
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+
+ASYNC_ROUTES = frozenset({"/api/spotify/playlists", "/api/preview"})
+
+# The middleware rejects bodies over 64 KiB by default with an empty 400,
+# which most bulk create bodies exceed; allow what the Flask app accepts.
+wsgi_app = AsyncioWSGIMiddleware(
+    flask_app, max_body_size=flask_app.config["MAX_CONTENT_LENGTH"]
+)
+
+
+async def app(
+    scope: Scope, receive: ASGIReceiveCallable, send: ASGISendCallable
+) -> None:
+    """
+    Dispatches the Spotify-bound routes to the async app
+    and everything else to the Flask app.
+    """
+    if scope["type"] == "lifespan" or scope.get("path") in ASYNC_ROUTES:
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,208 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+from spotipy import Spotify
+from spotipy.exceptions import SpotifyException
+
+from .models.spotify_types import SpotifyItem
+from .spotify_utils import PLAYLIST_ITEMS_FIELDS
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1/"
+# Retries the same statuses as spotipy, with the same backoff as the urllib3
+# Retry it configures: none before the first retry, then 0.6 s, 1.2 s, ...
+MAX_RETRIES = Spotify.max_retries
+RETRY_STATUSES = frozenset(Spotify.default_retry_codes)
+BACKOFF_FACTOR = 0.3
+
+
+def get_retry_delay(response: Optional[httpx.Response], attempt: int) -> float:
+    """Returns how long to wait before retrying after failed attempt `attempt`."""
+    if response is not None and "Retry-After" in response.headers:
+        try:
+            return float(response.headers["Retry-After"])
+        except ValueError:
+            pass
+    return 0.0 if attempt == 0 else BACKOFF_FACTOR * 2**attempt
+
+
+def create_http_client(
+    max_connections: int = 200, max_keepalive_connections: int = 50
+) -> httpx.AsyncClient:
+    """
+    Creates the pooled HTTP client shared by every request handled on an event loop.
+    """
+    return httpx.AsyncClient(
+        base_url=SPOTIFY_API_URL,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        ),
+        timeout=httpx.Timeout(10.0, connect=5.0),
+    )
+
+
+class AsyncSpotify:
+    """
+    A minimal asyncio counterpart of `spotipy.Spotify` covering the Web API calls
+    the server makes. Errors are raised as `SpotifyException` so route handlers
+    can treat both clients alike.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, access_token: str) -> None:
+        self.http = http
+        self.headers = {"Authorization": f"Bearer {access_token}"}
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = await self.http.request(
+                    method, url, params=params, headers=self.headers
+                )
+            except httpx.ConnectError:
+                if attempt == MAX_RETRIES:
+                    raise
+                await asyncio.sleep(get_retry_delay(None, attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+                await asyncio.sleep(get_retry_delay(response, attempt))
+                continue
+            break
+
+        if response.status_code >= 400:
+            try:
+                message = response.json()["error"]["message"]
+            except Exception:
+                message = "error"
+            raise SpotifyException(
+                response.status_code,
+                -1,
+                f"{response.request.url}:\n {message}",
+                headers=dict(response.headers),
+            )
+
+        if not response.content:
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def me(self) -> Dict[str, Any]:
+        return await self._request("GET", "me")
+
+    async def next(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not result.get("next"):
+            return None
+        return await self._request("GET", result["next"])
+
+    async def current_user_playlists(self, limit: int = 50) -> Dict[str, Any]:
+        return await self._request("GET", "me/playlists", params={"limit": limit})
+
+    async def current_user_saved_tracks(self, limit: int = 20) -> Dict[str, Any]:
+        return await self._request("GET", "me/tracks", params={"limit": limit})
+
+    async def playlist(
+        self, playlist_id: str, fields: Optional[str] = None
+    ) -> Dict[str, Any]:
+        params = {"fields": fields} if fields else None
+        return await self._request("GET", f"playlists/{playlist_id}", params=params)
+
+    async def playlist_items(
+        self,
+        playlist_id: str,
+        fields: Optional[str] = None,
+        additional_types: Sequence[str] = ("track",),
+    ) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"additional_types": ",".join(additional_types)}
+        if fields:
+            params["fields"] = fields
+        return await self._request(
+            "GET", f"playlists/{playlist_id}/tracks", params=params
+        )
+
+
+async def fetch_all_items(
+    sp: AsyncSpotify, first_page: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Follows the `next` links of a paged result and collects every item."""
+    items: List[Dict[str, Any]] = list(first_page["items"])
+    page: Optional[Dict[str, Any]] = first_page
+    while page and page.get("next"):
+        page = await sp.next(page)
+        if page:
+            items.extend(page["items"])
+    return items
+
+
+async def get_all_user_playlists(sp: AsyncSpotify) -> List[Dict[str, Any]]:
+    """
+    Fetches all public and private playlists of the current user, handling pagination.
+    """
+    return await fetch_all_items(sp, await sp.current_user_playlists())
+
+
+async def get_liked_songs_as_playlist(sp: AsyncSpotify) -> Dict[str, Any]:
+    """
+    Fetches the user's liked songs and formats them as a playlist-like dictionary.
+    """
+    saved_tracks, user = await asyncio.gather(
+        sp.current_user_saved_tracks(limit=1), sp.me()
+    )
+
+    return {
+        "id": "liked-songs",
+        "name": "Liked Songs",
+        "public": False,
+        "description": "All your liked songs",
+        "owner": {
+            "display_name": user["display_name"],
+            "id": "me",
+            "uri": "",
+            "external_urls": {},
+        },
+        "tracks": {"total": saved_tracks["total"]},
+        "images": [],
+    }
+
+
+async def fetch_playlist_first_page(
+    sp: AsyncSpotify, playlist_id: str
+) -> Dict[str, Any]:
+    """Fetches the first page of a playlist's tracks, including the track total."""
+    return await sp.playlist_items(
+        playlist_id, fields=PLAYLIST_ITEMS_FIELDS, additional_types=("track", "episode")
+    )
+
+
+async def fetch_playlist_tracks(
+    sp: AsyncSpotify, playlist_id: str, first_page: Optional[Dict[str, Any]] = None
+) -> List[SpotifyItem]:
+    """
+    Fetches all tracks for a given playlist ID,
+    continuing from `first_page` when it has already been fetched.
+    """
+    if first_page is None:
+        first_page = await fetch_playlist_first_page(sp, playlist_id)
+    return await fetch_all_items(sp, first_page)  # type: ignore[return-value]
+
+
+async def fetch_liked_songs_first_page(sp: AsyncSpotify) -> Dict[str, Any]:
+    return await sp.current_user_saved_tracks(limit=50)
+
+
+async def fetch_liked_songs(
+    sp: AsyncSpotify, first_page: Optional[Dict[str, Any]] = None
+) -> List[SpotifyItem]:
+    """
+    Fetches all liked songs for the authenticated user,
+    continuing from `first_page` when it has already been fetched.
+    """
+    if first_page is None:
+        first_page = await fetch_liked_songs_first_page(sp)
+    return await fetch_all_items(sp, first_page)  # type: ignore[return-value]
@@ -2,12 +2,19 @@ import base64
 import urllib.parse
 from typing import Any, Dict
 
-import requests
+from .lazy import ensure_loaded, lazy_import
+
+requests = lazy_import("requests")
 
 SPOTIFY_AUTH_URL = "https://accounts.spotify.com/authorize"
 SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
 
 
+def warm_up() -> None:
+    """Loads the HTTP client used for token exchanges."""
+    ensure_loaded(requests)
+
+
 def get_spotify_auth_url(client_id: str, redirect_uri: str) -> str:
     """
     Constructs the Spotify authorization URL.
@@ -52,3 +59,40 @@ def get_spotify_token(
     response.raise_for_status()
 
     return response.json()
+
+
+def is_refresh_token_rejected(error: Exception) -> bool:
+    """
+    Returns whether a token request failed because the refresh token was
+    revoked or has expired, in which case retrying it can never succeed.
+    """
+    response = getattr(error, "response", None)
+    if response is None or response.status_code != 400:
+        return False
+    try:
+        return bool(response.json().get("error") == "invalid_grant")
+    except ValueError:
+        return False
+
+
+def refresh_spotify_token(
+    client_id: str, client_secret: str, refresh_token: str
+) -> Dict[str, Any]:
+    """
+    Exchanges a stored refresh token for a new access token.
+    """
+    headers: Dict[str, str] = {
+        "Authorization": "Basic "
+        + base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+    }
+
+    payload: Dict[str, str] = {
+        "grant_type": "refresh_token",
+        "refresh_token": refresh_token,
+    }
+
+    response = requests.post(SPOTIFY_TOKEN_URL, data=payload, headers=headers)
+
+    response.raise_for_status()
+
+    return response.json()
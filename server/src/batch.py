@@ -0,0 +1,342 @@
+"""
+Offline batch processing of exported Spotify libraries, without the API.
+
+Each input file holds one library: a saved-tracks or playlist-items JSON dump
+(`.json`, a list of items or a page with an `items` key), a JSONL dump with one
+item or page per line (`.jsonl`), or the compact binary format written by
+`convert` (`.mlib`). Directories are expanded to the files they contain.
+Every format is parsed as it is read, one item at a time, so memory does not
+grow with the size of a library.
+
+    python -m src.batch process dumps/ --output previews.jsonl --workers 8
+    python -m src.batch convert dumps/ --output-dir compact/
+"""
+
+import argparse
+import codecs
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .models.spotify_types import SpotifyItem
+from .spotify_utils import format_monthly_preview, process_tracks_for_preview
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+INPUT_SUFFIXES = (".json", ".jsonl", ".mlib")
+READ_CHUNK_SIZE = 1024 * 1024
+
+# .mlib layout: the magic bytes, the track count (uint32), each track's artist
+# count (uint8), then one UTF-8 block holding every track's added_at, URI, name
+# and artist names, separated by NUL. The block is decoded and split a chunk at
+# a time, and items without a track or a date are not stored.
+MLIB_MAGIC = b"MLIB\x03"
+SEPARATOR = "\x00"
+
+_uint32 = struct.Struct("<I")
+
+
+def load_json(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dump_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class _JSONStream:
+    """
+    Decodes JSON values one at a time from a file read in chunks, keeping only
+    the unread part of the current chunk in memory.
+    """
+
+    def __init__(self, f: BinaryIO) -> None:
+        self._f = f
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads the next chunk, returning False at the end of the file."""
+        if self._eof:
+            return False
+        chunk = self._f.read(READ_CHUNK_SIZE)
+        self._eof = not chunk
+        self._buffer = self._buffer[self._position :] + self._decoder.decode(
+            chunk, final=self._eof
+        )
+        self._position = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or "" at the end."""
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in " \t\r\n"
+            ):
+                self._position += 1
+            if self._position < len(self._buffer) or not self._fill():
+                return self._buffer[self._position : self._position + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' in JSON input.")
+        self._position += 1
+
+    def value(self) -> Any:
+        """Decodes the next value, reading more of the file until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk.
+            if end < len(self._buffer) or not self._fill():
+                self._position = end
+                return value
+
+    def array(self) -> Iterator[Any]:
+        """Yields the elements of the array starting at the next value."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._position += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self._position += 1
+                return
+            self.expect(",")
+
+
+def read_json_items(path: str) -> Iterator[SpotifyItem]:
+    """
+    Yields the items of a JSON list, or of the `items` list of a JSON page,
+    decoding them one at a time. Other keys of a page are skipped.
+    """
+    with open(path, "rb") as f:
+        stream = _JSONStream(f)
+        if stream.peek() == "[":
+            yield from stream.array()
+            return
+
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if key == "items":
+                yield from stream.array()
+            else:
+                stream.value()
+            if stream.peek() == ",":
+                stream.expect(",")
+
+
+def read_jsonl_items(path: str) -> Iterator[SpotifyItem]:
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            value = load_json(line)
+            if isinstance(value, dict) and "items" in value:
+                yield from value["items"]
+            else:
+                yield value
+
+
+def write_mlib(items: Iterable[SpotifyItem], out: BinaryIO) -> int:
+    """Writes items in the compact binary format and returns how many it kept."""
+    artist_counts = bytearray()
+    fields: List[str] = []
+    for item in items:
+        track = item.get("track")
+        if not item.get("added_at") or not track:
+            continue
+
+        artists = track["artists"][:255]
+        artist_counts.append(len(artists))
+        fields.append(item["added_at"])
+        fields.append(track["uri"])
+        fields.append(track["name"])
+        fields.extend(artist["name"] for artist in artists)
+
+    out.write(MLIB_MAGIC)
+    out.write(_uint32.pack(len(artist_counts)))
+    out.write(artist_counts)
+    out.write(
+        SEPARATOR.join(field.replace(SEPARATOR, "") for field in fields).encode("utf-8")
+    )
+    return len(artist_counts)
+
+
+def _read_fields(f: BinaryIO) -> Iterator[List[str]]:
+    """
+    Yields the NUL-separated fields of an .mlib block in batches, one per chunk
+    read. A field cut off at the end of a chunk is completed from the next one.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    partial = ""
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE)
+        fields = (partial + decoder.decode(chunk, final=not chunk)).split(SEPARATOR)
+        if not chunk:
+            yield fields
+            return
+        partial = fields.pop()
+        yield fields
+
+
+def read_mlib_items(path: str) -> Iterator[SpotifyItem]:
+    with open(path, "rb") as f:
+        if f.read(len(MLIB_MAGIC)) != MLIB_MAGIC:
+            raise ValueError(f"'{path}' is not a Monthlify library file.")
+
+        (count,) = _uint32.unpack(f.read(_uint32.size))
+        artist_counts = f.read(count)
+
+        fields: List[str] = []
+        field = 0
+        batches = _read_fields(f)
+        for artist_count in artist_counts:
+            artists_end = field + 3 + artist_count
+            while artists_end > len(fields):
+                fields = fields[field:] + next(batches)
+                artists_end -= field
+                field = 0
+            yield {
+                "added_at": fields[field],
+                "track": {
+                    "uri": fields[field + 1],
+                    "name": fields[field + 2],
+                    "artists": [
+                        {"name": name} for name in fields[field + 3 : artists_end]
+                    ],
+                },
+            }  # type: ignore[typeddict-item]
+            field = artists_end
+
+
+def read_items(path: str) -> Iterator[SpotifyItem]:
+    if path.endswith(".mlib"):
+        return read_mlib_items(path)
+    if path.endswith(".jsonl"):
+        return read_jsonl_items(path)
+    return read_json_items(path)
+
+
+def library_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def process_library(path: str) -> Tuple[bool, bytes]:
+    """
+    Builds the monthly preview of one library and returns whether it succeeded
+    with its JSONL line, serialized in the worker so the parent process only has
+    to write it out.
+    """
+    try:
+        preview = format_monthly_preview(process_tracks_for_preview(read_items(path)))
+        record: Dict[str, Any] = {"library": library_name(path), "preview": preview}
+        ok = True
+    except Exception as e:
+        record = {"library": library_name(path), "error": str(e)}
+        ok = False
+    return ok, dump_json(record) + b"\n"
+
+
+def find_inputs(paths: List[str]) -> List[str]:
+    """Expands directories to the library files they contain, in sorted order."""
+    inputs: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            inputs.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.endswith(INPUT_SUFFIXES)
+            )
+        else:
+            inputs.append(path)
+    return inputs
+
+
+def run_process(
+    inputs: List[str], output: IO[bytes], workers: Optional[int], chunksize: int
+) -> int:
+    """Processes libraries across a process pool and returns how many failed."""
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for ok, line in executor.map(process_library, inputs, chunksize=chunksize):
+            failed += not ok
+            output.write(line)
+    return failed
+
+
+def run_convert(inputs: List[str], output_dir: str) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    for path in inputs:
+        target = os.path.join(output_dir, library_name(path) + ".mlib")
+        with open(target, "wb") as out:
+            count = write_mlib(read_items(path), out)
+        print(f"Converted '{path}' ({count} tracks) to '{target}'.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Build monthly previews from exported library dumps.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    process = commands.add_parser("process", help="write a preview per library")
+    process.add_argument("inputs", nargs="+", help="library files or directories")
+    process.add_argument(
+        "--output", default="-", help="JSONL file to write (default: stdout)"
+    )
+    process.add_argument("--workers", type=int, default=None)
+    process.add_argument(
+        "--chunksize", type=int, default=16, help="libraries sent to a worker at once"
+    )
+
+    convert = commands.add_parser("convert", help="rewrite dumps as .mlib files")
+    convert.add_argument("inputs", nargs="+", help="library files or directories")
+    convert.add_argument("--output-dir", required=True)
+
+    args = parser.parse_args(argv)
+    inputs = find_inputs(args.inputs)
+
+    if args.command == "convert":
+        run_convert(inputs, args.output_dir)
+        return 0
+
+    started = time.perf_counter()
+    if args.output == "-":
+        failed = run_process(inputs, sys.stdout.buffer, args.workers, args.chunksize)
+    else:
+        with open(args.output, "wb", buffering=1024 * 1024) as output:
+            failed = run_process(inputs, output, args.workers, args.chunksize)
+
+    print(
+        f"Processed {len(inputs)} libraries ({failed} failed) "
+        f"in {time.perf_counter() - started:.1f} s.",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from .models.spotify_types import MonthCheckpoint
+from .store import KeyValueStore
+
+CHECKPOINT_PREFIX = "create-checkpoint:"
+CHECKPOINT_TTL = 60 * 60 * 24
+
+
+def derive_idempotency_key(
+    identifier: str, monthly_playlists_details: List[Dict[str, Any]]
+) -> str:
+    """
+    Derives an idempotency key from a create request body,
+    so that retrying the same request resumes it even without a client-sent key.
+    """
+    body = {
+        "identifier": identifier,
+        "playlists": [
+            {
+                "name": playlist.get("name"),
+                "songs": [song.get("id") for song in playlist.get("songs", [])],
+            }
+            for playlist in monthly_playlists_details
+        ],
+    }
+    encoded = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CreateCheckpoints:
+    """
+    Per-month progress of a bulk create request, keyed by user and idempotency key.
+    A retry with the same key skips every step that has already succeeded.
+    Checkpoints only survive a worker restart, and are only seen by other
+    workers, when the store is backed by Redis.
+    """
+
+    def __init__(
+        self, store: KeyValueStore, user_id: str, idempotency_key: str
+    ) -> None:
+        self.store = store
+        self.prefix = f"{CHECKPOINT_PREFIX}{user_id}:{idempotency_key}:"
+
+    def load(self, playlist_name: str) -> MonthCheckpoint:
+        checkpoint: Optional[MonthCheckpoint] = self.store.get(
+            self.prefix + playlist_name
+        )
+        if checkpoint is None:
+            return {
+                "playlist": None,
+                "pending_uris": [],
+                "chunks_added": 0,
+                "cover_uploaded": False,
+            }
+        return checkpoint
+
+    def save(self, playlist_name: str, checkpoint: MonthCheckpoint) -> None:
+        self.store.set(self.prefix + playlist_name, checkpoint, ttl=CHECKPOINT_TTL)
+
+    def clear(self) -> None:
+        """Drops the checkpoints of every month once the request has completed."""
+        for key in self.store.keys(self.prefix):
+            self.store.delete(key)
@@ -0,0 +1,89 @@
+import gzip
+import os
+from typing import Dict, Optional
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset(
+    {"application/json", "text/html", "text/plain", "text/css", "text/javascript"}
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the best supported content coding from an Accept-Encoding header,
+    preferring brotli over gzip when the client accepts both equally.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best: Optional[str] = None
+    best_quality = 0.0
+    for encoding in candidates:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def get_min_size() -> int:
+    return int(os.getenv("MONTHLIFY_COMPRESS_MIN_SIZE", "1024"))
+
+
+def compress_body(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compresses a response body with the given content coding. The default levels
+    favour server CPU: on large previews they are several times faster than the
+    library defaults for a few percent larger output.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=1 if level is None else level)
+    return gzip.compress(data, compresslevel=1 if level is None else level)
+
+
+def register_compression(app: Flask, min_size: Optional[int] = None) -> None:
+    """
+    Compresses text and JSON responses of at least `min_size` bytes with brotli
+    or gzip, depending on what the client accepts. The threshold defaults to
+    MONTHLIFY_COMPRESS_MIN_SIZE (1024 bytes).
+    """
+    threshold = min_size if min_size is not None else get_min_size()
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < threshold:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        response.set_data(compress_body(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -1,12 +1,19 @@
+import binascii
 import os
 import random
-from typing import List, Tuple, Union
+import time
+from functools import lru_cache
+from io import BytesIO
+from typing import IO, List, Optional, Tuple, TypedDict, Union, cast
 
 from PIL import Image, ImageDraw, ImageFilter, ImageFont
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 FONTS_DIR = os.path.join(BASE_DIR, "fonts")
 
+# Spotify rejects cover uploads whose base64 payload is larger than 256 KB.
+SPOTIFY_COVER_MAX_BYTES = int(os.getenv("MONTHLIFY_COVER_MAX_BYTES", str(256 * 1024)))
+
 GRADIENT_PRESETS: List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = [
     ((0, 180, 255), (255, 0, 150)),  # Blue → Pink
     ((255, 95, 109), (255, 195, 113)),  # Coral → Peach
@@ -16,6 +23,7 @@ GRADIENT_PRESETS: List[Tuple[Tuple[int, int, int], Tuple[int, int, int]]] = [
 ]
 
 
+@lru_cache(maxsize=None)
 def load_font(
     filename: str, size: int
 ) -> Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]:
@@ -25,6 +33,12 @@ def load_font(
     return ImageFont.load_default()
 
 
+def preload_fonts(size: int = 640) -> None:
+    """Loads the fonts used for covers of the given size into the font cache."""
+    load_font("Montserrat-Bold.ttf", size // 5)
+    load_font("Montserrat-Bold.ttf", size // 7)
+
+
 def draw_blurred_text(
     base_image: Image.Image,
     text: str,
@@ -96,3 +110,140 @@ def create_playlist_cover(month_code: str, year: int, size: int = 640) -> Image.
     )
 
     return image.convert("RGB")
+
+
+class EncodedCover(TypedDict):
+    """Represents a cover encoded for upload, with its encoding statistics."""
+
+    data: bytes
+    size: int
+    quality: int
+    attempts: int
+    encode_ms: float
+
+
+class CoverBudgetExceeded(Exception):
+    """Raised mid-encode once a cover can no longer fit its byte budget."""
+
+
+class Base64Writer:
+    """
+    A write-only stream that base64-encodes bytes as the encoder produces them,
+    so the raw JPEG is never held in memory. Aborts the encode as soon as the
+    output would exceed `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        self.output = BytesIO()
+        self.max_bytes = max_bytes
+        self._pending = b""
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        if self._pending:
+            head = 3 - len(self._pending)
+            self._pending += bytes(view[:head])
+            view = view[head:]
+            if len(self._pending) == 3:
+                self.output.write(binascii.b2a_base64(self._pending, newline=False))
+                self._pending = b""
+
+        usable = len(view) - len(view) % 3
+        if usable:
+            self.output.write(binascii.b2a_base64(view[:usable], newline=False))
+        self._pending += bytes(view[usable:])
+
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise CoverBudgetExceeded()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    @property
+    def size(self) -> int:
+        """The encoded size, including the padding still to be written."""
+        return self.output.tell() + (4 if self._pending else 0)
+
+    def getvalue(self) -> bytes:
+        if self._pending:
+            self.output.write(binascii.b2a_base64(self._pending, newline=False))
+            self._pending = b""
+        return self.output.getvalue()
+
+
+def encode_cover(
+    img: Image.Image,
+    max_bytes: int = SPOTIFY_COVER_MAX_BYTES,
+    quality: int = 85,
+    min_quality: int = 30,
+) -> EncodedCover:
+    """
+    Encodes a cover as base64 JPEG no larger than `max_bytes`, trying `quality`
+    first. If that is too large, the next quality is interpolated from the sizes
+    seen so far, so oversized covers typically take two or three attempts.
+    Encodes that grow far past the budget are aborted early.
+    """
+    start = time.perf_counter()
+    target = 0.97 * max_bytes
+    attempts = 0
+    low, high = min_quality, quality + 1
+    fit: Optional[Tuple[int, int]] = None  # (quality, size) of the best fit
+    too_large: Optional[Tuple[int, int]] = None  # (quality, size) of the best miss
+    best_data: Optional[bytes] = None
+
+    while low < high:
+        attempts += 1
+        writer = Base64Writer(4 * max_bytes)
+        try:
+            img.save(cast(IO[bytes], writer), "JPEG", quality=quality, optimize=True)
+            data = writer.getvalue()
+        except CoverBudgetExceeded:
+            data = None
+
+        if data is not None and len(data) <= max_bytes:
+            fit, best_data = (quality, len(data)), data
+            low = quality + 1
+            if len(data) >= 0.9 * max_bytes:
+                break
+        else:
+            too_large = (quality, writer.size)
+            high = quality
+
+        if fit and too_large:
+            (fit_q, fit_size), (miss_q, miss_size) = fit, too_large
+            quality = fit_q + int(
+                (target - fit_size) * (miss_q - fit_q) / (miss_size - fit_size)
+            )
+        elif too_large:
+            quality = int(too_large[0] * target / too_large[1])
+        else:
+            break
+        quality = max(low, min(high - 1, quality))
+
+    if fit is None or best_data is None:
+        raise ValueError(
+            f"Cover does not fit in {max_bytes} bytes at quality {min_quality}."
+        )
+
+    return {
+        "data": best_data,
+        "size": fit[1],
+        "quality": fit[0],
+        "attempts": attempts,
+        "encode_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def render_cover_jpeg_base64(month_code: str, year: int) -> EncodedCover:
+    """
+    Renders a playlist cover and encodes it as the base64 JPEG
+    expected by Spotify's cover upload endpoint.
+    """
+    cover = encode_cover(create_playlist_cover(month_code, year))
+    print(
+        f"Encoded {month_code} {year} cover: {cover['size']} bytes "
+        f"at quality {cover['quality']} in {cover['encode_ms']:.1f} ms "
+        f"({cover['attempts']} attempt(s))."
+    )
+    return cover
@@ -0,0 +1,77 @@
+import os
+from typing import Any, Type, Union, cast
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from flask.sansio.app import App
+from werkzeug.sansio.response import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    A JSON provider that serializes with orjson, writing response bodies
+    straight to bytes. Anything orjson cannot encode falls back to the stdlib.
+    Dates are passed through to Flask's `default`, so they are encoded as HTTP
+    dates like with the stdlib provider instead of orjson's RFC 3339.
+    """
+
+    def _option(self, indent: bool) -> int:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(
+                obj,
+                default=self.default,
+                option=self._option(bool(kwargs.get("indent"))),
+            ).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(
+                obj,
+                default=self.default,
+                option=self._option(indent) | orjson.OPT_APPEND_NEWLINE,
+            )
+        except TypeError:
+            return super().response(*args, **kwargs)
+        app = cast(Flask, self._app)
+        return app.response_class(body, mimetype=self.mimetype)
+
+
+def get_json_provider_class() -> Type[JSONProvider]:
+    """
+    Returns the JSON provider selected by MONTHLIFY_JSON_ENCODER ("orjson" or
+    "stdlib"). Defaults to orjson when it is installed.
+    """
+    encoder = os.getenv("MONTHLIFY_JSON_ENCODER", "orjson")
+    if encoder == "orjson" and orjson is not None:
+        return OrjsonProvider
+    return DefaultJSONProvider
+
+
+def init_json_provider(app: App) -> None:
+    """Installs the selected JSON provider on a Flask or Quart app."""
+    app.json_provider_class = get_json_provider_class()
+    app.json = app.json_provider_class(app)
@@ -0,0 +1,44 @@
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Any, Optional
+
+
+class _LazyModule(ModuleType):
+    """
+    Stands in for a module until one of its attributes is used, then imports it.
+    `importlib.import_module` holds the per-module import lock, so concurrent
+    first uses from several threads all see a fully initialised module.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Returns a module whose code only runs on first attribute access,
+    so heavy dependencies are not paid for by workers that never use them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named '{name}'")
+    return _LazyModule(name)
+
+
+def ensure_loaded(*modules: ModuleType) -> None:
+    """Forces lazily imported modules to finish loading."""
+    for module in modules:
+        if isinstance(module, _LazyModule):
+            module._load()
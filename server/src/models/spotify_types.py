@@ -92,3 +92,110 @@ class MonthlyPlaylistPreview(TypedDict):
     id: str
     name: str
     tracks: List[MonthlyTrack]
+
+
+class RefreshFailure(TypedDict):
+    """Represents the failed background refreshes of a user's preview index."""
+
+    failed_at: float
+    failures: int
+
+
+class TrackIndexEntry(TypedDict):
+    """
+    Represents a stored track index: tracks sorted by date added,
+    with each one's position in the source.
+    """
+
+    tracks: List[MonthlyTrack]
+    positions: List[int]
+
+
+class PreviewIndexEntry(TrackIndexEntry):
+    """
+    Represents a precomputed index of a user's liked songs,
+    at the version returned by `get_liked_songs_version`.
+    """
+
+    refreshed_at: float
+    version: str
+
+
+class CreatedPlaylist(TypedDict):
+    """Represents a playlist created or updated by Monthlify."""
+
+    name: str
+    id: str
+    url: str
+    action: str
+
+
+class MonthCheckpoint(TypedDict):
+    """Represents the progress of one monthly playlist in a bulk create request."""
+
+    playlist: Optional[CreatedPlaylist]
+    pending_uris: List[str]
+    chunks_added: int
+    cover_uploaded: bool
+
+
+class AppliedPlaylistState(TypedDict):
+    """Represents the cover Monthlify last applied to one of its playlists."""
+
+    cover_fingerprint: str
+    cover_url: Optional[str]
+
+
+class PlaylistPlan(TypedDict):
+    """Represents what a bulk create still has to do for one monthly playlist."""
+
+    name: str
+    playlist_id: Optional[str]
+    url: Optional[str]
+    action: str
+    description: Optional[str]
+    pending_uris: List[str]
+    chunks_added: int
+    upload_cover: bool
+    cover_fingerprint: str
+
+
+class PlannedMutation(TypedDict):
+    """Represents one Spotify write call in a mutation plan."""
+
+    type: str
+    playlist: str
+    track_count: int
+
+
+class MutationPlan(TypedDict):
+    """Represents the ordered writes of a bulk create and their estimated cost."""
+
+    playlists: List[PlaylistPlan]
+    mutations: List[PlannedMutation]
+    read_calls: int
+    write_calls: int
+    cover_renders: int
+    estimated_seconds: float
+
+
+class PlaylistPlanSummary(TypedDict):
+    """Represents the writes planned for one monthly playlist, as counts."""
+
+    name: str
+    playlist_id: Optional[str]
+    action: str
+    change_description: bool
+    tracks_to_add: int
+    upload_cover: bool
+    write_calls: int
+
+
+class MutationPlanSummary(TypedDict):
+    """Represents a mutation plan as returned by the dry run."""
+
+    playlists: List[PlaylistPlanSummary]
+    read_calls: int
+    write_calls: int
+    cover_renders: int
+    estimated_seconds: float
@@ -0,0 +1,308 @@
+import os
+from typing import Any, Dict, List, Tuple
+
+import spotipy
+
+from . import image_utils, playlist_state, spotify_utils, track_index
+from .checkpoints import CreateCheckpoints
+from .models.spotify_types import (
+    CreatedPlaylist,
+    MutationPlan,
+    MutationPlanSummary,
+    PlannedMutation,
+    Playlist,
+    PlaylistPlan,
+    PlaylistPlanSummary,
+)
+from .store import KeyValueStore
+
+TRACKS_PER_CHUNK = 100
+PLAYLISTS_PER_PAGE = 50
+
+# Rough per-call costs used to estimate how long a plan takes to run.
+SPOTIFY_CALL_SECONDS = float(os.getenv("MONTHLIFY_SPOTIFY_CALL_SECONDS", "0.2"))
+COVER_RENDER_SECONDS = float(os.getenv("MONTHLIFY_COVER_RENDER_SECONDS", "0.3"))
+
+
+def list_owned_playlists(
+    sp: spotipy.Spotify, user_id: str
+) -> Tuple[Dict[str, Playlist], int]:
+    """
+    Lists every playlist the user owns, keyed by name (the first one wins),
+    and returns it with the number of pages it took.
+    """
+    results: Dict[str, Any] = sp.current_user_playlists(limit=PLAYLISTS_PER_PAGE)
+    pages = 1
+    playlists: Dict[str, Playlist] = {}
+    while True:
+        for playlist in results["items"]:
+            if playlist["owner"]["id"] == user_id:
+                playlists.setdefault(playlist["name"], playlist)
+        if not results["next"]:
+            return playlists, pages
+        results = sp.next(results)
+        pages += 1
+
+
+def count_chunks(track_count: int) -> int:
+    return (track_count + TRACKS_PER_CHUNK - 1) // TRACKS_PER_CHUNK
+
+
+def list_mutations(playlist: PlaylistPlan) -> List[PlannedMutation]:
+    """Returns the writes a playlist plan performs, in execution order."""
+    name = playlist["name"]
+    mutations: List[PlannedMutation] = []
+    if playlist["playlist_id"] is None:
+        mutations.append(
+            {"type": "create_playlist", "playlist": name, "track_count": 0}
+        )
+    elif playlist["description"] is not None:
+        mutations.append({"type": "change_details", "playlist": name, "track_count": 0})
+
+    pending_uris = playlist["pending_uris"]
+    for chunk_index in range(playlist["chunks_added"], count_chunks(len(pending_uris))):
+        chunk = pending_uris[
+            chunk_index * TRACKS_PER_CHUNK : (chunk_index + 1) * TRACKS_PER_CHUNK
+        ]
+        mutations.append(
+            {"type": "add_tracks", "playlist": name, "track_count": len(chunk)}
+        )
+
+    if playlist["upload_cover"]:
+        mutations.append({"type": "upload_cover", "playlist": name, "track_count": 0})
+    return mutations
+
+
+def plan_playlist(
+    sp: spotipy.Spotify,
+    store: KeyValueStore,
+    progress: CreateCheckpoints,
+    owned_playlists: Dict[str, Playlist],
+    source_playlist_name: str,
+    playlist_name: str,
+    track_uris: List[str],
+) -> Tuple[PlaylistPlan, int]:
+    """
+    Works out what one monthly playlist still needs, and the number of
+    read calls that took. A month with a checkpoint resumes from it; otherwise
+    the plan is diffed against the user's existing playlist, if any.
+    """
+    label, year = track_index.get_cover_label(playlist_name)
+    fingerprint = playlist_state.cover_fingerprint(label, year)
+
+    checkpoint = progress.load(playlist_name)
+    if checkpoint["playlist"] is not None:
+        created = checkpoint["playlist"]
+        return {
+            "name": playlist_name,
+            "playlist_id": created["id"],
+            "url": created["url"],
+            "action": created["action"],
+            "description": None,
+            "pending_uris": checkpoint["pending_uris"],
+            "chunks_added": checkpoint["chunks_added"],
+            "upload_cover": not checkpoint["cover_uploaded"],
+            "cover_fingerprint": fingerprint,
+        }, 0
+
+    existing = owned_playlists.get(playlist_name)
+    if existing is None:
+        return {
+            "name": playlist_name,
+            "playlist_id": None,
+            "url": None,
+            "action": "created",
+            "description": f"Created by Monthlify from {source_playlist_name}",
+            "pending_uris": track_uris,
+            "chunks_added": 0,
+            "upload_cover": True,
+            "cover_fingerprint": fingerprint,
+        }, 0
+
+    present_uris = set(spotify_utils.fetch_playlist_track_uris(sp, existing["id"]))
+    description = f"Updated by Monthlify from {source_playlist_name}"
+    return {
+        "name": playlist_name,
+        "playlist_id": existing["id"],
+        "url": existing["external_urls"]["spotify"],
+        "action": "updated",
+        "description": (
+            None
+            if playlist_state.description_matches(existing, description)
+            else description
+        ),
+        "pending_uris": [uri for uri in track_uris if uri not in present_uris],
+        "chunks_added": 0,
+        "upload_cover": not playlist_state.cover_is_current(
+            store, existing, fingerprint
+        ),
+        "cover_fingerprint": fingerprint,
+    }, max(1, count_chunks(existing["tracks"]["total"]))
+
+
+def plan_monthly_playlists(
+    sp: spotipy.Spotify,
+    user_id: str,
+    source_playlist_name: str,
+    monthly_playlists_details: List[Dict[str, Any]],
+    progress: CreateCheckpoints,
+    store: KeyValueStore,
+) -> MutationPlan:
+    """
+    Reads the user's playlists once and computes the minimal ordered writes
+    needed to bring every selected month up to date: playlist creates,
+    description changes, 100-track add chunks and cover uploads.
+    """
+    owned_playlists, read_calls = list_owned_playlists(sp, user_id)
+
+    playlists: List[PlaylistPlan] = []
+    for playlist_data in monthly_playlists_details:
+        playlist_name = playlist_data.get("name")
+        songs_list = playlist_data.get("songs", [])
+
+        if not playlist_name:
+            continue
+
+        track_uris = [song["id"] for song in songs_list if "id" in song]
+
+        if not track_uris:
+            continue
+
+        playlist, playlist_reads = plan_playlist(
+            sp,
+            store,
+            progress,
+            owned_playlists,
+            source_playlist_name,
+            playlist_name,
+            track_uris,
+        )
+        playlists.append(playlist)
+        read_calls += playlist_reads
+
+    mutations = [mutation for plan in playlists for mutation in list_mutations(plan)]
+    cover_renders = sum(1 for plan in playlists if plan["upload_cover"])
+    return {
+        "playlists": playlists,
+        "mutations": mutations,
+        "read_calls": read_calls,
+        "write_calls": len(mutations),
+        "cover_renders": cover_renders,
+        "estimated_seconds": round(
+            len(mutations) * SPOTIFY_CALL_SECONDS
+            + cover_renders * COVER_RENDER_SECONDS,
+            2,
+        ),
+    }
+
+
+def summarize_plan(plan: MutationPlan) -> MutationPlanSummary:
+    """
+    Reduces a plan to per-playlist counts for the dry run, leaving out the
+    track URIs and cover fingerprints only `execute_plan` needs.
+    """
+    playlists: List[PlaylistPlanSummary] = [
+        {
+            "name": playlist["name"],
+            "playlist_id": playlist["playlist_id"],
+            "action": playlist["action"],
+            "change_description": (
+                playlist["playlist_id"] is not None
+                and playlist["description"] is not None
+            ),
+            "tracks_to_add": max(
+                0,
+                len(playlist["pending_uris"])
+                - playlist["chunks_added"] * TRACKS_PER_CHUNK,
+            ),
+            "upload_cover": playlist["upload_cover"],
+            "write_calls": len(list_mutations(playlist)),
+        }
+        for playlist in plan["playlists"]
+    ]
+    return {
+        "playlists": playlists,
+        "read_calls": plan["read_calls"],
+        "write_calls": plan["write_calls"],
+        "cover_renders": plan["cover_renders"],
+        "estimated_seconds": plan["estimated_seconds"],
+    }
+
+
+def execute_plan(
+    sp: spotipy.Spotify,
+    user_id: str,
+    plan: MutationPlan,
+    progress: CreateCheckpoints,
+    store: KeyValueStore,
+) -> List[CreatedPlaylist]:
+    """
+    Runs the writes of a plan and nothing else, checkpointing each month after
+    every write so that a retry with the same idempotency key resumes it.
+    """
+    created_playlists: List[CreatedPlaylist] = []
+    for playlist in plan["playlists"]:
+        name = playlist["name"]
+        created: CreatedPlaylist
+
+        if playlist["playlist_id"] is None:
+            print(f"Creating a new playlist named '{name}'.")
+            new_playlist = sp.user_playlist_create(
+                user=user_id,
+                name=name,
+                public=False,
+                description=playlist["description"],
+            )
+            created = {
+                "name": new_playlist["name"],
+                "id": new_playlist["id"],
+                "url": new_playlist["external_urls"]["spotify"],
+                "action": "created",
+            }
+        else:
+            created = {
+                "name": name,
+                "id": playlist["playlist_id"],
+                "url": playlist["url"] or "",
+                "action": playlist["action"],
+            }
+            if playlist["description"] is not None:
+                sp.playlist_change_details(
+                    created["id"], description=playlist["description"]
+                )
+
+        checkpoint = progress.load(name)
+        checkpoint["playlist"] = created
+        checkpoint["pending_uris"] = playlist["pending_uris"]
+        checkpoint["chunks_added"] = playlist["chunks_added"]
+        checkpoint["cover_uploaded"] = not playlist["upload_cover"]
+        progress.save(name, checkpoint)
+
+        def save_chunks_added(chunks_added: int) -> None:
+            checkpoint["chunks_added"] = chunks_added
+            progress.save(name, checkpoint)
+
+        spotify_utils.add_tracks_in_chunks(
+            sp,
+            user_id,
+            created["id"],
+            playlist["pending_uris"],
+            start_chunk=playlist["chunks_added"],
+            on_chunk_added=save_chunks_added,
+        )
+
+        if playlist["upload_cover"]:
+            month_code, year = track_index.get_cover_label(name)
+            cover = image_utils.render_cover_jpeg_base64(month_code, year)
+
+            if spotify_utils.upload_playlist_cover_image(
+                sp, created["id"], cover["data"]
+            ):
+                playlist_state.record_cover(
+                    store, created["id"], playlist["cover_fingerprint"]
+                )
+                checkpoint["cover_uploaded"] = True
+                progress.save(name, checkpoint)
+
+        created_playlists.append(created)
+    return created_playlists
@@ -0,0 +1,65 @@
+import hashlib
+import html
+from typing import Any, Mapping, Optional
+
+from .models.spotify_types import AppliedPlaylistState
+from .store import KeyValueStore
+
+PLAYLIST_STATE_PREFIX = "playlist-state:"
+
+# Bump when the cover design changes, so existing playlists get the new covers.
+COVER_DESIGN_VERSION = 1
+
+
+def cover_fingerprint(label: str, year: int) -> str:
+    """Identifies the cover that would be rendered for a label and year."""
+    key = f"{COVER_DESIGN_VERSION}:{label}:{year}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def get_cover_url(playlist: Mapping[str, Any]) -> Optional[str]:
+    images = playlist.get("images") or []
+    return images[0]["url"] if images else None
+
+
+def description_matches(playlist: Mapping[str, Any], description: str) -> bool:
+    """
+    Returns whether a playlist already has the given description.
+    The Web API returns descriptions HTML-escaped.
+    """
+    return html.unescape(playlist.get("description") or "") == description
+
+
+def cover_is_current(
+    store: KeyValueStore, playlist: Mapping[str, Any], fingerprint: str
+) -> bool:
+    """
+    Returns whether the playlist still shows the cover Monthlify last uploaded
+    with this fingerprint. The image URL is only known once Spotify has processed
+    an upload, so it is recorded the first time the playlist is seen afterwards;
+    from then on a different URL means the cover was replaced.
+    """
+    state: Optional[AppliedPlaylistState] = store.get(
+        PLAYLIST_STATE_PREFIX + playlist["id"]
+    )
+    current_url = get_cover_url(playlist)
+    if state is None or state["cover_fingerprint"] != fingerprint or not current_url:
+        return False
+
+    if state["cover_url"] is None:
+        record_cover(store, playlist["id"], fingerprint, current_url)
+        return True
+    return state["cover_url"] == current_url
+
+
+def record_cover(
+    store: KeyValueStore,
+    playlist_id: str,
+    fingerprint: str,
+    cover_url: Optional[str] = None,
+) -> None:
+    state: AppliedPlaylistState = {
+        "cover_fingerprint": fingerprint,
+        "cover_url": cover_url,
+    }
+    store.set(PLAYLIST_STATE_PREFIX + playlist_id, state)
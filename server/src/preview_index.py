@@ -0,0 +1,255 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import spotipy
+
+from . import auth, spotify_utils
+from .models.spotify_types import PreviewIndexEntry, RefreshFailure
+from .store import KeyValueStore
+from .track_index import TrackIndex
+
+SUBSCRIBER_PREFIX = "preview-index-user:"
+INDEX_PREFIX = "preview-index:"
+REFRESH_LOCK_PREFIX = "preview-index-lock:"
+REFRESH_SLOT_PREFIX = "preview-index-slot:"
+FAILURE_PREFIX = "preview-index-failure:"
+
+
+def opt_in(store: KeyValueStore, user_id: str, refresh_token: str) -> None:
+    """
+    Registers a user for background refreshes of their Liked Songs track index.
+    """
+    store.set(
+        SUBSCRIBER_PREFIX + user_id,
+        {"refresh_token": refresh_token, "opted_in_at": time.time()},
+    )
+
+
+def opt_out(store: KeyValueStore, user_id: str) -> None:
+    """Removes a user from background refreshes and drops their index."""
+    store.delete(SUBSCRIBER_PREFIX + user_id)
+    store.delete(INDEX_PREFIX + user_id)
+    store.delete(FAILURE_PREFIX + user_id)
+
+
+def opt_out_refresh_token(store: KeyValueStore, refresh_token: str) -> None:
+    """Opts out the users that opted in with the given refresh token."""
+    for key in store.keys(SUBSCRIBER_PREFIX):
+        subscriber = store.get(key)
+        if subscriber is not None and subscriber["refresh_token"] == refresh_token:
+            opt_out(store, key[len(SUBSCRIBER_PREFIX) :])
+
+
+def is_opted_in(store: KeyValueStore, user_id: str) -> bool:
+    return store.get(SUBSCRIBER_PREFIX + user_id) is not None
+
+
+def save_index(
+    store: KeyValueStore, user_id: str, index: TrackIndex, version: str
+) -> None:
+    entry: PreviewIndexEntry = {
+        "refreshed_at": time.time(),
+        "version": version,
+        "tracks": index.tracks,
+        "positions": index.positions,
+    }
+    store.set(INDEX_PREFIX + user_id, entry)
+
+
+def get_fresh_index(
+    store: KeyValueStore, user_id: str, max_age: int, version: str
+) -> Optional[TrackIndex]:
+    """
+    Returns the precomputed liked songs index for a user, or None if there is
+    none, it is older than `max_age` seconds or the liked songs have changed
+    since (their current `version` differs).
+    """
+    entry: Optional[PreviewIndexEntry] = store.get(INDEX_PREFIX + user_id)
+    if (
+        entry is None
+        or entry["version"] != version
+        or time.time() - entry["refreshed_at"] > max_age
+    ):
+        return None
+    return TrackIndex.from_entry(entry)
+
+
+def build_liked_songs_index(sp: spotipy.Spotify) -> tuple[TrackIndex, str]:
+    """
+    Fetches the user's liked songs and indexes them by date added,
+    returning the index with the version it was built at.
+    """
+    first_page = spotify_utils.fetch_liked_songs_first_page(sp)
+    index = TrackIndex.from_items(spotify_utils.fetch_liked_songs(sp, first_page))
+    return index, spotify_utils.get_liked_songs_version(first_page)
+
+
+class PreviewIndexScheduler:
+    """
+    Periodically refreshes the liked songs index of every opted-in user whose
+    index is older than `refresh_interval` seconds, using their stored refresh token.
+
+    Every worker runs a scheduler, so users and refresh slots are claimed through
+    the store: each user is refreshed by one worker at a time, and at most
+    `max_concurrent_refreshes` users are refreshed at the same time across every
+    process sharing the store. Claims expire after `claim_ttl` seconds in case
+    a worker dies mid-refresh. With the in-memory store each worker only sees
+    the users that opted in through it.
+
+    A failed refresh is retried with exponential backoff from `poll_interval` up
+    to `refresh_interval`, so users that keep failing cannot hold every slot.
+    Users whose refresh token is rejected are opted out.
+    """
+
+    def __init__(
+        self,
+        store: KeyValueStore,
+        client_id: str,
+        client_secret: str,
+        refresh_interval: int = 3600,
+        poll_interval: int = 60,
+        max_concurrent_refreshes: int = 2,
+        claim_ttl: int = 900,
+    ) -> None:
+        self.store = store
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+        self.max_concurrent_refreshes = max_concurrent_refreshes
+        self.claim_ttl = claim_ttl
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_refreshes,
+            thread_name_prefix="preview-index",
+        )
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="preview-index-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Preview index scheduler error: {e}")
+            self._stop_event.wait(self.poll_interval)
+
+    def retry_delay(self, failures: int) -> float:
+        """Returns how long to wait before retrying after `failures` failures."""
+        return float(min(self.poll_interval * 2**failures, self.refresh_interval))
+
+    def stale_users(self) -> List[str]:
+        """
+        Returns opted-in users whose index is missing or stale and that are not
+        backing off after a failure, least recently attempted first.
+        """
+        now = time.time()
+        stale: List[tuple[float, str]] = []
+        for key in self.store.keys(SUBSCRIBER_PREFIX):
+            user_id = key[len(SUBSCRIBER_PREFIX) :]
+            entry: Optional[PreviewIndexEntry] = self.store.get(INDEX_PREFIX + user_id)
+            refreshed_at = entry["refreshed_at"] if entry else 0.0
+            if now - refreshed_at < self.refresh_interval:
+                continue
+
+            failure: Optional[RefreshFailure] = self.store.get(FAILURE_PREFIX + user_id)
+            attempted_at = refreshed_at
+            if failure is not None:
+                if now - failure["failed_at"] < self.retry_delay(failure["failures"]):
+                    continue
+                attempted_at = max(attempted_at, failure["failed_at"])
+            stale.append((attempted_at, user_id))
+        return [user_id for _, user_id in sorted(stale)]
+
+    def record_failure(self, user_id: str) -> None:
+        key = FAILURE_PREFIX + user_id
+        previous: Optional[RefreshFailure] = self.store.get(key)
+        failure: RefreshFailure = {
+            "failed_at": time.time(),
+            "failures": previous["failures"] + 1 if previous else 1,
+        }
+        self.store.set(key, failure)
+
+    def _claim_slot(self) -> Optional[str]:
+        for slot in range(self.max_concurrent_refreshes):
+            key = f"{REFRESH_SLOT_PREFIX}{slot}"
+            if self.store.add(key, time.time(), ttl=self.claim_ttl):
+                return key
+        return None
+
+    def run_once(self) -> None:
+        """
+        Schedules refreshes for stale users without exceeding the concurrency limit.
+        Users that do not fit, or that another worker is refreshing,
+        are picked up on a later poll.
+        """
+        for user_id in self.stale_users():
+            slot = self._claim_slot()
+            if slot is None:
+                return
+            lock = REFRESH_LOCK_PREFIX + user_id
+            if not self.store.add(lock, time.time(), ttl=self.claim_ttl):
+                self.store.delete(slot)
+                continue
+            self._executor.submit(self._refresh_and_release, user_id, lock, slot)
+
+    def _refresh_and_release(self, user_id: str, lock: str, slot: str) -> None:
+        try:
+            self.refresh_user(user_id)
+        except Exception as e:
+            print(f"Failed to refresh preview index for '{user_id}': {e}")
+            self.record_failure(user_id)
+        finally:
+            self.store.delete(lock)
+            self.store.delete(slot)
+
+    def refresh_user(self, user_id: str) -> None:
+        subscriber = self.store.get(SUBSCRIBER_PREFIX + user_id)
+        if subscriber is None:
+            return
+
+        # Another worker may have refreshed the user since `stale_users` ran.
+        entry: Optional[PreviewIndexEntry] = self.store.get(INDEX_PREFIX + user_id)
+        if entry and time.time() - entry["refreshed_at"] < self.refresh_interval:
+            return
+
+        try:
+            token_info = auth.refresh_spotify_token(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                refresh_token=subscriber["refresh_token"],
+            )
+        except Exception as e:
+            if not auth.is_refresh_token_rejected(e):
+                raise
+            print(f"Refresh token of '{user_id}' was rejected, opting them out.")
+            opt_out(self.store, user_id)
+            return
+
+        # Spotify may rotate the refresh token; keep the newest one.
+        new_refresh_token = token_info.get("refresh_token")
+        if new_refresh_token and new_refresh_token != subscriber["refresh_token"]:
+            opt_in(self.store, user_id, new_refresh_token)
+
+        sp = spotipy.Spotify(auth=token_info["access_token"])
+        index, version = build_liked_songs_index(sp)
+        save_index(self.store, user_id, index, version)
+        self.store.delete(FAILURE_PREFIX + user_id)
+        print(f"Refreshed preview index for '{user_id}'.")
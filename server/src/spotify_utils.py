@@ -1,7 +1,5 @@
-import base64
 from collections import defaultdict
-from io import BytesIO
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from urllib.parse import parse_qs, urlparse
 
 import spotipy
@@ -9,7 +7,6 @@ import spotipy
 from .models.spotify_types import (
     MonthlyPlaylistPreview,
     MonthlyTrack,
-    Playlist,
     SpotifyItem,
     SpotifyPlaylistsResult,
 )
@@ -54,21 +51,38 @@ def get_liked_songs_as_playlist(sp: spotipy.Spotify) -> Dict[str, Any]:
     return liked_songs_playlist
 
 
-def fetch_playlist_tracks(sp: spotipy.Spotify, playlist_id: str) -> List[SpotifyItem]:
-    """Fetches all tracks for a given playlist ID using the provided Spotify client."""
-    results: Dict[str, Any] = sp.playlist_items(
+PLAYLIST_ITEMS_FIELDS = (
+    "items.added_at,"
+    "items.track.name,"
+    "items.track.artists,"
+    "items.track.uri,"
+    "next,"
+    "total"
+)
+
+
+def fetch_playlist_first_page(sp: spotipy.Spotify, playlist_id: str) -> Dict[str, Any]:
+    """Fetches the first page of a playlist's tracks, including the track total."""
+    first_page: Dict[str, Any] = sp.playlist_items(
         playlist_id,
-        fields=(
-            "items.added_at,"
-            "items.track.name,"
-            "items.track.artists,"
-            "items.track.uri,"
-            "next"
-        ),
+        fields=PLAYLIST_ITEMS_FIELDS,
         additional_types=("track", "episode"),
     )
+    return first_page
 
-    tracks: List[SpotifyItem] = results["items"]
+
+def fetch_playlist_tracks(
+    sp: spotipy.Spotify,
+    playlist_id: str,
+    first_page: Optional[Dict[str, Any]] = None,
+) -> List[SpotifyItem]:
+    """
+    Fetches all tracks for a given playlist ID using the provided Spotify client,
+    continuing from `first_page` when it has already been fetched.
+    """
+    results = first_page or fetch_playlist_first_page(sp, playlist_id)
+
+    tracks: List[SpotifyItem] = list(results["items"])
     while results["next"]:
         results = sp.next(results)
         tracks.extend(results["items"])
@@ -76,10 +90,30 @@ def fetch_playlist_tracks(sp: spotipy.Spotify, playlist_id: str) -> List[Spotify
     return tracks
 
 
-def fetch_liked_songs(sp: spotipy.Spotify) -> List[SpotifyItem]:
-    """Fetches all liked songs for the authenticated user."""
-    results: Dict[str, Any] = sp.current_user_saved_tracks(limit=50)
-    tracks: List[SpotifyItem] = results["items"]
+def fetch_liked_songs_first_page(sp: spotipy.Spotify) -> Dict[str, Any]:
+    first_page: Dict[str, Any] = sp.current_user_saved_tracks(limit=50)
+    return first_page
+
+
+def get_liked_songs_version(first_page: Dict[str, Any]) -> str:
+    """
+    Identifies the state of the liked songs from their first page, newest first:
+    liking a track changes the newest date added, and unliking one the total.
+    """
+    items = first_page["items"]
+    newest_added_at = items[0]["added_at"] if items else ""
+    return f"{first_page['total']}:{newest_added_at}"
+
+
+def fetch_liked_songs(
+    sp: spotipy.Spotify, first_page: Optional[Dict[str, Any]] = None
+) -> List[SpotifyItem]:
+    """
+    Fetches all liked songs for the authenticated user,
+    continuing from `first_page` when it has already been fetched.
+    """
+    results = first_page or fetch_liked_songs_first_page(sp)
+    tracks: List[SpotifyItem] = list(results["items"])
     while results["next"]:
         results = sp.next(results)
         tracks.extend(results["items"])
@@ -87,7 +121,7 @@ def fetch_liked_songs(sp: spotipy.Spotify) -> List[SpotifyItem]:
 
 
 def process_tracks_for_preview(
-    tracks: List[SpotifyItem],
+    tracks: Iterable[SpotifyItem],
 ) -> Dict[str, List[MonthlyTrack]]:
     """
     Processes a list of tracks and returns a dictionary of monthly previews.
@@ -95,29 +129,35 @@ def process_tracks_for_preview(
     """
     monthly_playlists: Dict[str, List[MonthlyTrack]] = defaultdict(list)
     for item in tracks:
-        added_at = item.get("added_at")
-        track = item.get("track")
-
-        if added_at and track:
-            added_date = added_at.split("T")[0]
-            year_month = added_date[:7]  # e.g., "2023-01"
-
-            track_name = track["name"]
-            artist_names = ", ".join([artist["name"] for artist in track["artists"]])
-            track_uri = track["uri"]
-
-            monthly_playlists[year_month].append(
-                {
-                    "id": track_uri,
-                    "name": track_name,
-                    "artists": artist_names,
-                    "added_at": added_at,
-                    "uri": track_uri,
-                }
-            )
+        monthly_track = to_monthly_track(item)
+
+        if monthly_track:
+            year_month = monthly_track["added_at"][:7]  # e.g., "2023-01"
+            monthly_playlists[year_month].append(monthly_track)
     return dict(monthly_playlists)
 
 
+def to_monthly_track(item: SpotifyItem) -> Optional[MonthlyTrack]:
+    """
+    Converts a playlist or saved-tracks item into the track details shown in
+    previews, or returns None for items without a track or an added date.
+    """
+    added_at = item.get("added_at")
+    track = item.get("track")
+
+    if not added_at or not track:
+        return None
+
+    track_uri = track["uri"]
+    return {
+        "id": track_uri,
+        "name": track["name"],
+        "artists": ", ".join([artist["name"] for artist in track["artists"]]),
+        "added_at": added_at,
+        "uri": track_uri,
+    }
+
+
 def format_monthly_preview(
     monthly_data: Dict[str, List[MonthlyTrack]],
 ) -> List[MonthlyPlaylistPreview]:
@@ -153,115 +193,59 @@ def get_month_name(month_number: int) -> str:
     return calendar.month_name[month_number]
 
 
-def get_monthly_previews_from_id(
-    sp: spotipy.Spotify, playlist_id: str
-) -> List[MonthlyPlaylistPreview]:
-    """Processes tracks from a given playlist ID and returns a monthly preview."""
-    try:
-        tracks = fetch_playlist_tracks(sp, playlist_id)
-        monthly_data = process_tracks_for_preview(tracks)
-        return format_monthly_preview(monthly_data)
-    except Exception as e:
-        raise Exception(f"Failed to process playlist: {e}")
-
-
-def get_monthly_previews_from_url(
-    sp: spotipy.Spotify, playlist_url: str
-) -> List[MonthlyPlaylistPreview]:
-    """Extracts ID from a URL and returns a monthly preview."""
-    try:
-        parsed_url = urlparse(playlist_url)
-        if "spotify.com/playlist/" not in playlist_url:
-            raise ValueError("Invalid Spotify playlist URL.")
-
-        playlist_id = parsed_url.path.split("/")[-1]
-        return get_monthly_previews_from_id(sp, playlist_id)
-    except Exception as e:
-        raise Exception(f"Invalid URL or failed to fetch playlist: {e}")
-
-
-def get_monthly_previews_from_liked_songs(
-    sp: spotipy.Spotify,
-) -> List[MonthlyPlaylistPreview]:
-    """Fetches and processes liked songs, returning a monthly preview."""
-    try:
-        liked_songs = fetch_liked_songs(sp)
-        monthly_data = process_tracks_for_preview(liked_songs)
-        return format_monthly_preview(monthly_data)
-    except Exception as e:
-        raise Exception(f"Failed to process liked songs: {e}")
-
-
-def find_existing_playlist(
-    sp: spotipy.Spotify, user_id: str, playlist_name: str
-) -> Optional[Playlist]:
-    """
-    Checks if a playlist with a given name already exists for the user.
-    """
-    playlists: Dict[str, Any] = sp.user_playlists(user=user_id)
-    for playlist in playlists["items"]:
-        if playlist["name"] == playlist_name:
-            return playlist
-    return None
+def fetch_playlist_track_uris(sp: spotipy.Spotify, playlist_id: str) -> List[str]:
+    """Fetches the URIs of every track in a playlist, across all pages."""
+    results: Dict[str, Any] = sp.playlist_items(
+        playlist_id, fields="items.track.uri,next", limit=100
+    )
+    items: List[Dict[str, Any]] = list(results["items"])
+    while results["next"]:
+        results = sp.next(results)
+        items.extend(results["items"])
+    return [item["track"]["uri"] for item in items if item.get("track")]
 
 
-def create_playlist_with_tracks(
+def add_tracks_in_chunks(
     sp: spotipy.Spotify,
     user_id: str,
-    source_playlist_name: str,
-    playlist_name: str,
+    playlist_id: str,
     track_uris: List[str],
-) -> Dict[str, Any]:
+    start_chunk: int = 0,
+    on_chunk_added: Optional[Callable[[int], None]] = None,
+) -> None:
     """
-    Creates a new Spotify playlist and adds tracks to it,
-    or updates an existing playlist with new unique tracks.
+    Adds tracks in the 100-track chunks accepted by the Web API, in order,
+    starting from chunk `start_chunk`. `on_chunk_added` is called with the number
+    of chunks added so far after each one succeeds.
     """
-    existing_playlist = find_existing_playlist(sp, user_id, playlist_name)
-
-    if existing_playlist:
-        print(f"Playlist '{playlist_name}' already exists. Appending new tracks.")
-        playlist_id = existing_playlist["id"]
+    for chunk_index in range(start_chunk, (len(track_uris) + 99) // 100):
+        chunk = track_uris[chunk_index * 100 : (chunk_index + 1) * 100]
+        sp.user_playlist_add_tracks(user=user_id, playlist_id=playlist_id, tracks=chunk)
+        if on_chunk_added:
+            on_chunk_added(chunk_index + 1)
 
-        sp.playlist_change_details(
-            playlist_id, description=f"Updated by Monthlify from {source_playlist_name}"
-        )
 
-        existing_tracks = sp.playlist_items(playlist_id)["items"]
-        existing_track_uris = {track["track"]["uri"] for track in existing_tracks}
-
-        new_track_uris = [uri for uri in track_uris if uri not in existing_track_uris]
-
-        if new_track_uris:
-            for i in range(0, len(new_track_uris), 100):
-                chunk = new_track_uris[i : i + 100]
-                sp.user_playlist_add_tracks(
-                    user=user_id, playlist_id=playlist_id, tracks=chunk
-                )
-            print(f"Added {len(new_track_uris)} new tracks to '{playlist_name}'.")
-        else:
-            print(
-                f"All tracks already exist in '{playlist_name}'. No new tracks added."
-            )
-
-        return {"playlist": existing_playlist, "action_taken": "updated"}
-
-    else:
-        print(f"Creating a new playlist named '{playlist_name}'.")
-        new_playlist = sp.user_playlist_create(
-            user=user_id,
-            name=playlist_name,
-            public=False,
-            description=f"Created by Monthlify from {source_playlist_name}",
-        )
-        playlist_id = new_playlist["id"]
+def extract_playlist_id(identifier: str) -> Optional[str]:
+    """
+    Extracts the playlist ID from a Spotify playlist URL,
+    or returns the identifier unchanged if it is already an ID.
+    """
+    if "spotify.com/playlist/" not in identifier:
+        return identifier
 
-        if track_uris:
-            for i in range(0, len(track_uris), 100):
-                chunk = track_uris[i : i + 100]
-                sp.user_playlist_add_tracks(
-                    user=user_id, playlist_id=playlist_id, tracks=chunk
-                )
-        return {"playlist": new_playlist, "action_taken": "created"}
+    try:
+        parsed_url = urlparse(identifier)
+        playlist_id = parsed_url.path.split("/")[-1]
+        if not playlist_id:
+            # MyPy fix: Added a check for the `uri` from `parse_qs` to be a list
+            uri_list = parse_qs(parsed_url.query).get("uri", [None])
+            if uri_list and uri_list[0]:
+                playlist_id = uri_list[0].split(":")[-1]
+            else:
+                return None
+    except (ValueError, IndexError):
+        return None
+    return playlist_id
 
 
 def get_playlist_name_from_identifier(
@@ -270,21 +254,9 @@ def get_playlist_name_from_identifier(
     """
     Gets the playlist name from a Spotify playlist ID or URL.
     """
-    if "spotify.com/playlist/" in identifier:
-        try:
-            parsed_url = urlparse(identifier)
-            playlist_id = parsed_url.path.split("/")[-1]
-            if not playlist_id:
-                # MyPy fix: Added a check for the `uri` from `parse_qs` to be a list
-                uri_list = parse_qs(parsed_url.query).get("uri", [None])
-                if uri_list and uri_list[0]:
-                    playlist_id = uri_list[0].split(":")[-1]
-                else:
-                    return None
-        except (ValueError, IndexError):
-            return None
-    else:
-        playlist_id = identifier
+    playlist_id = extract_playlist_id(identifier)
+    if not playlist_id:
+        return None
 
     try:
         playlist = sp.playlist(playlist_id)
@@ -294,14 +266,13 @@ def get_playlist_name_from_identifier(
 
 
 def upload_playlist_cover_image(
-    sp: spotipy.Spotify, playlist_id: str, image_stream: BytesIO
+    sp: spotipy.Spotify, playlist_id: str, image_b64: bytes
 ) -> bool:
     """
-    Uploads a new cover image for a playlist from a byte stream.
+    Uploads a new base64-encoded JPEG cover image for a playlist.
     """
     try:
-        image_data = base64.b64encode(image_stream.getvalue()).decode("utf-8")
-        sp.playlist_upload_cover_image(playlist_id, image_data)
+        sp.playlist_upload_cover_image(playlist_id, image_b64)
         return True
     except Exception as e:
         print(f"Error uploading playlist cover: {e}")
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+
+class KeyValueStore(Protocol):
+    """A minimal JSON key-value store shared by the server's background jobs."""
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the value stored under `key`, or None if it is missing."""
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Stores `value` under `key`, expiring it after `ttl` seconds if given."""
+
+    def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Stores `value` under `key` only if the key is missing, and returns whether
+        it did. Used as a lock shared by every process using the store.
+        """
+
+    def delete(self, key: str) -> None:
+        """Removes `key` if it exists."""
+
+    def keys(self, prefix: str) -> List[str]:
+        """Returns every key starting with `prefix`."""
+
+
+class InMemoryStore:
+    """
+    A thread-safe, process-local store. Used when no Redis URL is configured.
+    Expired entries are swept out on writes, at most every `sweep_interval`
+    seconds, so keys that are never read again do not pile up.
+    """
+
+    def __init__(self, sweep_interval: float = 60.0) -> None:
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _is_live(self, entry: Tuple[Any, Optional[float]], now: float) -> bool:
+        return entry[1] is None or entry[1] > now
+
+    def _sweep(self, now: float) -> None:
+        """Drops every expired entry. Must be called with the lock held."""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self._sweep_interval
+        expired = [
+            key for key, entry in self._data.items() if not self._is_live(entry, now)
+        ]
+        for key in expired:
+            del self._data[key]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if not self._is_live(entry, time.monotonic()):
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            self._data[key] = (value, now + ttl if ttl else None)
+
+    def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._data.get(key)
+            if entry is not None and self._is_live(entry, now):
+                return False
+            self._data[key] = (value, now + ttl if ttl else None)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def keys(self, prefix: str) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            return [
+                key
+                for key, entry in self._data.items()
+                if key.startswith(prefix) and self._is_live(entry, now)
+            ]
+
+
+class RedisStore:
+    """
+    A store backed by a (typically local) Redis instance.
+    Values are serialized as JSON.
+    """
+
+    def __init__(self, url: str, namespace: str = "monthlify:") -> None:
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._namespace = namespace
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._namespace + key)
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._client.set(self._namespace + key, json.dumps(value), ex=ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        return bool(
+            self._client.set(self._namespace + key, json.dumps(value), ex=ttl, nx=True)
+        )
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._namespace + key)
+
+    def keys(self, prefix: str) -> List[str]:
+        offset = len(self._namespace)
+        return [
+            key.decode("utf-8")[offset:]
+            for key in self._client.scan_iter(match=f"{self._namespace}{prefix}*")
+        ]
+
+
+_store: Optional[KeyValueStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> KeyValueStore:
+    """
+    Returns the process-wide store, backed by Redis when MONTHLIFY_REDIS_URL is set
+    and by an in-process dictionary otherwise.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            redis_url = os.getenv("MONTHLIFY_REDIS_URL")
+            if redis_url:
+                _store = RedisStore(redis_url)
+            else:
+                print(
+                    "MONTHLIFY_REDIS_URL is not set, using an in-memory store: "
+                    "create checkpoints, preview index opt-ins and cached indexes "
+                    "are local to this worker and lost when it restarts."
+                )
+                _store = InMemoryStore()
+        return _store
@@ -0,0 +1,228 @@
+import calendar
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .models.spotify_types import (
+    MonthlyPlaylistPreview,
+    MonthlyTrack,
+    SpotifyItem,
+    TrackIndexEntry,
+)
+from .spotify_utils import format_monthly_preview, to_monthly_track
+from .store import KeyValueStore
+
+GRANULARITIES = ("week", "month", "quarter", "year")
+
+TRACK_INDEX_PREFIX = "track-index:"
+SHARED_TRACK_INDEX_PREFIX = "shared-track-index:"
+
+
+def get_period(day: date, granularity: str) -> Tuple[str, date]:
+    """
+    Returns the key of the period containing `day` and the first day after it.
+    Keys sort chronologically, e.g. "2023-W05", "2023-01", "2023-Q1" or "2023".
+    """
+    if granularity == "week":
+        iso_year, week, weekday = day.isocalendar()
+        start = day - timedelta(days=weekday - 1)
+        return f"{iso_year}-W{week:02d}", start + timedelta(days=7)
+    if granularity == "month":
+        end = (
+            date(day.year + 1, 1, 1)
+            if day.month == 12
+            else day.replace(month=day.month + 1, day=1)
+        )
+        return f"{day.year}-{day.month:02d}", end
+    if granularity == "quarter":
+        quarter = (day.month - 1) // 3 + 1
+        end = (
+            date(day.year + 1, 1, 1)
+            if quarter == 4
+            else date(day.year, 3 * quarter + 1, 1)
+        )
+        return f"{day.year}-Q{quarter}", end
+    if granularity == "year":
+        return str(day.year), date(day.year + 1, 1, 1)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def get_period_name(period_id: str, granularity: str) -> str:
+    """Returns the playlist name for a period key, e.g. "Q1 2023"."""
+    if granularity == "month":
+        year, month = period_id.split("-")
+        return f"{calendar.month_name[int(month)]} {year}"
+    if granularity in ("week", "quarter"):
+        year, period = period_id.split("-")
+        return f"{period} {year}"
+    return f"Year {period_id}"
+
+
+def get_cover_label(playlist_name: str) -> Tuple[str, int]:
+    """
+    Returns the cover text and year for a playlist name produced by
+    `get_period_name`, e.g. ("JAN", 2023), ("Q1", 2023) or ("YEAR", 2023).
+    """
+    name_parts = playlist_name.split()
+    label = name_parts[0].upper()
+    if label.capitalize() in calendar.month_name:
+        label = label[:3]
+    return label, int(name_parts[-1])
+
+
+class TrackIndex:
+    """
+    The tracks of one source sorted by `added_at`. Date-range queries use binary
+    search, and any granularity can be derived from it without refetching.
+    Each track keeps its position in the source, so results come back in the
+    source's own order (e.g. newest first for liked songs).
+    """
+
+    def __init__(
+        self, tracks: List[MonthlyTrack], positions: Optional[List[int]] = None
+    ) -> None:
+        """
+        Indexes `tracks` given in source order, or already sorted by `added_at`
+        when their source `positions` are passed along.
+        """
+        if positions is None:
+            order = sorted(range(len(tracks)), key=lambda i: tracks[i]["added_at"])
+            tracks = [tracks[i] for i in order]
+            positions = order
+        self.tracks = tracks
+        self.positions = positions
+        self.added_at = [track["added_at"] for track in self.tracks]
+
+    @classmethod
+    def from_items(cls, items: List[SpotifyItem]) -> "TrackIndex":
+        tracks = [track for track in map(to_monthly_track, items) if track]
+        return cls(tracks)
+
+    @classmethod
+    def from_entry(cls, entry: TrackIndexEntry) -> "TrackIndex":
+        return cls(entry["tracks"], entry["positions"])
+
+    def to_entry(self) -> TrackIndexEntry:
+        return {"tracks": self.tracks, "positions": self.positions}
+
+    def _in_source_order(self, low: int, high: int) -> List[MonthlyTrack]:
+        ordered = sorted(range(low, high), key=self.positions.__getitem__)
+        return [self.tracks[i] for i in ordered]
+
+    def _bounds(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        low = bisect_left(self.added_at, start.isoformat()) if start else 0
+        high = (
+            bisect_left(self.added_at, (end + timedelta(days=1)).isoformat())
+            if end
+            else len(self.added_at)
+        )
+        return low, high
+
+    def range(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[MonthlyTrack]:
+        """Returns the tracks added between `start` and `end`, both inclusive."""
+        low, high = self._bounds(start, end)
+        return self._in_source_order(low, high)
+
+    def group(
+        self,
+        granularity: str = "month",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, List[MonthlyTrack]]:
+        """
+        Buckets the tracks between `start` and `end` by period, each in source
+        order. Each bucket boundary is found by binary search, so the cost is one
+        lookup per period.
+        """
+        grouped: Dict[str, List[MonthlyTrack]] = {}
+        position, high = self._bounds(start, end)
+        while position < high:
+            day = date.fromisoformat(self.added_at[position][:10])
+            period_id, period_end = get_period(day, granularity)
+            next_position = bisect_left(
+                self.added_at, period_end.isoformat(), position, high
+            )
+            grouped[period_id] = self._in_source_order(position, next_position)
+            position = next_position
+        return grouped
+
+
+def format_period_preview(
+    grouped: Dict[str, List[MonthlyTrack]], granularity: str = "month"
+) -> List[MonthlyPlaylistPreview]:
+    """
+    Formats grouped tracks in the same shape as `format_monthly_preview`,
+    naming each playlist after its period.
+    """
+    if granularity == "month":
+        return format_monthly_preview(grouped)
+
+    return [
+        {
+            "id": period_id,
+            "name": get_period_name(period_id, granularity),
+            "tracks": grouped[period_id],
+        }
+        for period_id in sorted(grouped)
+    ]
+
+
+def get_cached_index(
+    store: KeyValueStore, user_id: str, source_id: str, version: str
+) -> Optional[TrackIndex]:
+    """
+    Returns a user's cached index of a source at a given version: a playlist's
+    snapshot ID, or the liked songs version from `get_liked_songs_version`.
+    """
+    entry: Optional[TrackIndexEntry] = store.get(
+        f"{TRACK_INDEX_PREFIX}{user_id}:{source_id}:{version}"
+    )
+    if entry is None:
+        return None
+    return TrackIndex.from_entry(entry)
+
+
+def save_cached_index(
+    store: KeyValueStore,
+    user_id: str,
+    source_id: str,
+    version: str,
+    index: TrackIndex,
+    ttl: int,
+) -> None:
+    store.set(
+        f"{TRACK_INDEX_PREFIX}{user_id}:{source_id}:{version}",
+        index.to_entry(),
+        ttl=ttl,
+    )
+
+
+def get_shared_index(
+    store: KeyValueStore, playlist_id: str, snapshot_id: str
+) -> Optional[TrackIndex]:
+    """
+    Returns the cached index of a public playlist at a given snapshot.
+    Entries are shared by every user, since a snapshot's tracks never change.
+    """
+    entry: Optional[TrackIndexEntry] = store.get(
+        f"{SHARED_TRACK_INDEX_PREFIX}{playlist_id}:{snapshot_id}"
+    )
+    if entry is None:
+        return None
+    return TrackIndex.from_entry(entry)
+
+
+def save_shared_index(
+    store: KeyValueStore,
+    playlist_id: str,
+    snapshot_id: str,
+    index: TrackIndex,
+    ttl: int,
+) -> None:
+    store.set(
+        f"{SHARED_TRACK_INDEX_PREFIX}{playlist_id}:{snapshot_id}",
+        index.to_entry(),
+        ttl=ttl,
+    )